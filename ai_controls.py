@@ -2,37 +2,20 @@
 
 Module with containing the AIController class, which controls the player using a neural network.
 """
-from copy import deepcopy
-from dataclasses import dataclass, field
-from queue import PriorityQueue
+from __future__ import annotations
+
 from typing import Optional
-import pygame
+import struct
 
 from ai_neural_net import NeuralNetGraph
+from game_map import GameMap
 from game_state import Actor, GameState
-from helpers import grid_distance, within_grid
-from vector import Vector
+from vector import TileVector
 
 import ai_constants as ai_const
-import game_constants as g_const
 import game_controls
 
 
-@dataclass(order=True)
-class TileItem:
-    """A dataclass representing a tile for a PriorityQueue to sort. Note that this allows for
-    the tile to not be sorted as part of the sorting.
-
-    Instance Attributes:
-        - priority: The priority of this tile.
-        - distance: The current distance traveled to this tile.
-        - tile: The tile's position on the grid.
-    """
-    priority: int
-    distance: int
-    tile: Vector = field(compare=False)
-
-
 class AIController(game_controls.Controller):
     """A class representing a controller which uses a neural network to control an actor.
 
@@ -49,6 +32,10 @@ class AIController(game_controls.Controller):
     ticks_alive: int
     last_score: tuple[int, int]
 
+    # The packed format of an AI controller's snapshot, which excludes the neural network so
+    # that another can take over from the snapshot.
+    SNAPSHOT = struct.Struct('<iii')
+
     def __init__(self, game: GameState, actor: Actor,
                  neural_net: Optional[NeuralNetGraph] = None) -> None:
         """Initialize an AI controller object.
@@ -64,7 +51,7 @@ class AIController(game_controls.Controller):
         self.ticks_alive = 0
         self.last_score = (0, self.ticks_alive)
 
-    def control(self, grid: list[list[int]]) -> None:
+    def control(self, grid: GameMap) -> None:
         """Controls the player using the neural network.
 
         Args:
@@ -84,9 +71,8 @@ class AIController(game_controls.Controller):
 
         # Propagate through neural network
         if self.is_check_neural_net(grid, directions):
-            self.get_inputs(grid, directions)
-            self.neural_net.propagate_outputs()
-            self.control_outputs(grid, directions)
+            outputs = self.neural_net.evaluate(self.get_inputs(grid, directions))
+            self.control_outputs(grid, directions, outputs)
 
         # Checks if player has been inactive
         self.ticks_alive += 1
@@ -97,7 +83,7 @@ class AIController(game_controls.Controller):
         elif self.ticks_alive - self.last_score[1] > timeout:
             self.game.lives = 0
 
-    def is_check_neural_net(self, grid: list[list[int]], directions: list[Vector]) -> bool:
+    def is_check_neural_net(self, grid: GameMap, directions: list[TileVector]) -> bool:
         """Returns whether or not the neural network should be checked, depending on if player
         can turn left or right.
 
@@ -109,13 +95,13 @@ class AIController(game_controls.Controller):
         left_tile = tile + directions[1]
         right_tile = tile + directions[-1]
 
-        can_left = grid[left_tile.y][left_tile.x] not in g_const.BAD_TILES
-        can_right = grid[right_tile.y][right_tile.x] not in g_const.BAD_TILES
+        can_left = not grid.is_wall(left_tile.x, left_tile.y)
+        can_right = not grid.is_wall(right_tile.x, right_tile.y)
 
         return can_left or can_right
 
-    def get_inputs(self, grid: list[list[int]], directions: list[Vector]) -> None:
-        """Updates the neural network's input nodes.
+    def get_inputs(self, grid: GameMap, directions: list[TileVector]) -> list[float]:
+        """Returns the values of the neural network's input nodes.
 
         Args:
             - grid: The current game's map grid.
@@ -123,36 +109,35 @@ class AIController(game_controls.Controller):
         """
         inputs = []
         tile = self.actor.tile()
-        # Targets to be searched for
-        target_tiles = {g_const.WALL, g_const.DOOR, g_const.OUT, g_const.DOT, g_const.BOOST}
-        # Get ghost positions
-        targets = [ghost.actor.tile() for ghost in self.game.ghosts() if ghost.state != 'inactive']
+        origin = grid.index(tile.x, tile.y)
+        # The position of the first direction within const.DIRECTION_ORDER
+        start = ai_const.DIRECTION_ROTATE.index(directions[0])
+        # Get the distances to ghosts in every direction
+        ghost_distances = self.game.ghost_distances(grid)
 
         # Get inputs for every direction around the player
-        for direction in directions:
-            next_tile = tile + direction
-
-            # Check if can move in this direction
-            if not within_grid(next_tile) or grid[next_tile.y][next_tile.x] in g_const.BAD_TILES:
+        for position, direction in enumerate(directions, start):
+            # Check if can move in this direction, looking up the distance to the first wall
+            # from the map.
+            wall_distance = grid.wall_distance(origin, position % 4)
+            if wall_distance == 1:
                 inputs.append(ai_const.ACTIVE)
             else:
                 inputs.append(ai_const.INACTIVE)
 
-            # Check if score can be increased in this direction
-            score_distance = 1
-            while grid[next_tile.y][next_tile.x] not in target_tiles:
-                next_tile += direction
-                score_distance += 1
-
-            if grid[next_tile.y][next_tile.x] in g_const.BAD_TILES:
+            # Check if score can be increased in this direction, looking up the distance to the
+            # first wall or pellet from the map. Pellets are never on walls, so the search ended
+            # at a wall if both distances are the same.
+            score_distance = grid.pellet_distance(origin, position % 4)
+            if score_distance == wall_distance:
                 inputs.append(ai_const.INACTIVE)
             else:
                 inputs.append(1 / max(ai_const.ACTIVE, score_distance - ai_const.DOTS_BIAS))
 
             # Check the distances to ghosts in direction
-            if targets != []:
-                distance = self.a_star_distance(grid, targets, direction)
-                inputs.append(max(ai_const.INACTIVE, 1 / distance))
+            distance = ghost_distances[position % 4]
+            if distance != -1:
+                inputs.append(1 / distance)
             else:
                 inputs.append(ai_const.INACTIVE)
 
@@ -165,73 +150,18 @@ class AIController(game_controls.Controller):
         # Input bias node
         inputs.append(ai_const.ACTIVE)
 
-        # Place input into input nodes
-        for node, value in zip(self.neural_net.input_nodes, inputs[:ai_const.INPUT_SIZE]):
-            node.value = value
-
-    def a_star_distance(self, grid: list[list[int]], targets: list[Vector],
-                        direction: Vector) -> int:
-        """By treating the grid as a representation of a graph, A Star is used to return shortest
-        distance needed to travel to get to a target position in direction.
-
-        Args:
-            - grid: The current game's map grid which is used like a graph.
-            - targets: The target tiles to look for.
-            - direction: The direction to check distance for.
-        """
-        # Sets up priority queue and copy of grid to track visited nodes.
-        path_grid = deepcopy(grid)
-        tile_queue = PriorityQueue()
-
-        tile = self.actor.tile()
-        # Don't allow revisiting of initial tile.
-        path_grid[tile.y][tile.x] = g_const.OUT
-
-        # Only append to queue if next direction isn't a bad tile
-        next_tile = tile + direction
-        if path_grid[next_tile.y][next_tile.x] not in g_const.BAD_TILES:
-            tile_queue.put(TileItem(0, 0, next_tile))
-
-        # Loop through until queue empty or target found.
-        while not tile_queue.empty():
-            item = tile_queue.get()
-            distance = item.distance + 1
-
-            # Check to see if each direction can be added.
-            for candidate in g_const.DIRECTION.values():
-                next_tile = item.tile + candidate
-
-                if next_tile in targets:
-                    # Target found!
-                    return distance
-                elif path_grid[next_tile.y][next_tile.x] not in g_const.BAD_TILES:
-                    # Use heuristic function as part of the given tile's priority.
-                    heuristic = self.distance_heuristic(next_tile, targets)
-                    tile_queue.put(TileItem(heuristic + distance, distance, next_tile))
+        return inputs[:ai_const.INPUT_SIZE]
 
-                    path_grid[next_tile.y][next_tile.x] = g_const.OUT
-
-        # If no path found.
-        return -1
-
-    @staticmethod
-    def distance_heuristic(position: Vector, targets: list[Vector]) -> int:
-        """Underestimates the real distance by returning the smallest grid distance to a target.
-
-        Args:
-            - position: Starting position for distance.
-            - targets: A list of target vectors as endpoints for distance.
-        """
-        return min(grid_distance(position, target) for target in targets)
-
-    def control_outputs(self, grid: list[list[int]], directions: list[Vector]) -> None:
-        """Taking the neural network's output nodes, move in an according direction.
+    def control_outputs(self, grid: GameMap, directions: list[TileVector],
+                        outputs: list[float]) -> None:
+        """Taking the values of the neural network's output nodes, move in an according direction.
 
         Args:
             - grid: The current game's map grid.
             - directions: The list of directions around the player's current direction.
+            - outputs: The values of the output nodes.
         """
-        net_int = [node.value for node in self.neural_net.output_nodes][:ai_const.OUTPUT_SIZE]
+        net_int = outputs[:ai_const.OUTPUT_SIZE]
         max_value = max(net_int)
 
         if max_value >= ai_const.MOVE_THRESHOLD:
@@ -242,19 +172,37 @@ class AIController(game_controls.Controller):
         """Resets the last score value for when associated actor dies."""
         self.last_score = (self.game.score, self.ticks_alive)
 
-    def draw_debug(self, screen: pygame.Surface) -> None:
-        """Draws out debugging information. Not needed for this controller!
+    def snapshot(self) -> bytes:
+        """Returns the controller's current state packed into bytes, not including its actor or
+        neural network.
+        """
+        return self.SNAPSHOT.pack(self.ticks_alive, *self.last_score)
+
+    def restore(self, data: bytes, offset: int) -> int:
+        """Restores the controller's state from a snapshot packed in data at offset, returning
+        the offset following it.
 
         Args:
-            - screen: The pygame game screen.
+            - data: The bytes containing the snapshot.
+            - offset: The position of the controller's snapshot within data.
+        """
+        self.ticks_alive, *last_score = self.SNAPSHOT.unpack_from(data, offset)
+        self.last_score = tuple(last_score)
+
+        return offset + self.SNAPSHOT.size
+
+    def debug_tiles(self) -> list[tuple[TileVector, tuple[int, int, int]]]:
+        """Returns the tiles to be highlighted as debugging information. Not needed for this
+        controller!
         """
+        return []
 
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['copy', 'queue', 'pygame', 'ai_constants', 'ai_neural_net',
-                          'game_constants', 'game_controls', 'game_state', 'helpers', 'vector'],
+        'extra-imports': ['struct', 'ai_constants', 'ai_neural_net', 'game_controls',
+                          'game_map', 'game_state', 'vector'],
         'max-line-length': 100,
         'disable': ['E1136']
     })
@@ -3,100 +3,175 @@
 Module with containing the NeuralNetGraph class, which acts as the brain of the AI controller.
 This module is based off the graph code from the Course Nodes and Assignment 3, though
 heavily modified.
+
+Neural networks are saved either as csv files of their edges, or as versioned binary network
+files (.pnet) which are loaded without parsing. Many networks may be saved together in a network
+archive file (.pnets), whose networks are each loaded on demand from the archive mapped into
+memory.
 """
 from __future__ import annotations
 
-from typing import Union
+from array import array
+from itertools import accumulate
+from os.path import splitext
+from typing import Optional, Sequence, TYPE_CHECKING, Union
 import csv
+import functools
+import math
+import mmap
+import os
 import random
-import scipy.special
+import struct
 
-from helpers import clamp
 import ai_constants as const
 
+# Only imports when type-checking, to only load numpy once weights are mutated.
+if TYPE_CHECKING:
+    import numpy as np
+
+
+# The kinds of nodes in a neural network, stored by their position
+NODE_KINDS = ('input', 'hidden', 'output')
+INPUT, HIDDEN, OUTPUT = range(len(NODE_KINDS))
+
+# Network file constants
+NETWORK_MAGIC = b'PNET'
+NETWORK_VERSION = 1
+NETWORK_HEADER = struct.Struct('=4sHHcxHId')
+# The start of the header, which is shared by neural networks of the same size, and the fitness
+# which follows it
+NETWORK_LAYOUT = struct.Struct('=4sHHcxHI')
+NETWORK_FITNESS = struct.Struct('=d')
+NETWORK_BYTE_ORDER = 0x0102
+NETWORK_ALIGNMENT = 8
+WEIGHT_FORMATS = ('d', 'f')
+# The amount of bytes read from a network file at once, which fits most network files
+NETWORK_READ_SIZE = 1 << 16
+
+# Network archive file constants
+ARCHIVE_MAGIC = b'PNTA'
+ARCHIVE_VERSION = 1
+ARCHIVE_HEADER = struct.Struct('=4sHHI')
+ARCHIVE_INDEX = struct.Struct('=Q')
+
 
-class _WeightedVertex:
-    """A weighted vertex in the neural network.
+class CompiledNetwork:
+    """A frozen evaluator of a neural network, which stores its nodes in topological order with
+    their edges as flat tuples, so that propagating does not need to search the graph.
+
+    Each node's value is kept at a slot of a flat list of values, with the input nodes first.
 
     Instance Attributes:
-        - number: The number of the vertex.
-        - kind: The type of node within the neural network.
-        - value: The node's outputted value.
-        - neighbors: The node's neighbours as a dict mapping the neighbor vertex to edge weight
+        - input_size: The amount of input nodes.
 
     Representation Invariants:
-        - self.number >= 0
-        - self.kind in {'input', 'hidden', 'output'}
+        - self.input_size >= 0
     """
-    number: int
-    kind: str
-    value: float
+    input_size: int
 
-    neighbours: dict[_WeightedVertex, Union[int, float]]
+    # Private Instance Attributes:
+    #  - _slot_count: The amount of slots in the list of values.
+    #  - _steps: The slot of each node other than the input nodes which the output nodes rely on,
+    #            along with the slots and weights of its edges, in the order to be updated.
+    #  - _outputs: The slot of each output node.
+    _slot_count: int
+    _steps: tuple[tuple[int, tuple[int, ...], tuple[float, ...]], ...]
+    _outputs: tuple[int, ...]
 
-    def __init__(self, number: int, kind: str) -> None:
-        """Initialize a new vertex with the given number.
+    def __init__(self, network: NeuralNetGraph) -> None:
+        """Compiles the given neural network.
 
         Preconditions:
-            - number >= 0
-            - kind in {'input', 'hidden', 'output'}
+            - The network is a directed acyclic graph, where every path ends at an input node.
 
         Args:
-            - number: The number of the vertex.
-            - kind: The type of node within the neural network.
+            - network: The neural network to be compiled.
         """
-        self.number = number
-        self.kind = kind
-        self.value = 0
+        inputs = network.get_numbers('input')
+        outputs = network.get_numbers('output')
 
-        self.neighbours = {}
+        self.input_size = len(inputs)
+        slots = {number: slot for slot, number in enumerate(inputs)}
+        steps = []
 
-    def get_connections(self) -> list[tuple[int, int, float]]:
-        """Recursively returns a list of all connects of the node and its neighbors.
-        Returns a list of tuples containing the initial node, the end node, and the weight of edge.
+        def visit(number: int) -> None:
+            """Gives the node a slot after all nodes it relies on, like propagating it would. """
+            edges = network.get_edges(number)
+            for neighbour, _ in edges:
+                if neighbour not in slots:
+                    visit(neighbour)
 
-        This implementation is valid because the neural network is a directed acyclic graph,
-        thus the base case is naturally the input nodes.
-        """
-        # Input nodes are the base case.
-        if self.kind == 'input':
-            return []
+            slots[number] = len(slots)
+            steps.append((slots[number], tuple(slots[neighbour] for neighbour, _ in edges),
+                          tuple(weight for _, weight in edges)))
 
-        out = []
-        for node, weight in self.neighbours.items():
-            # Represent connections as the initial node, the end node, and weight of edge.
-            out.append((self.number, node.number, weight))
-            # Recursively get connections.
-            out.extend(node.get_connections())
+        for output in outputs:
+            if output not in slots:
+                visit(output)
 
-        return out
+        self._slot_count = len(slots)
+        self._steps = tuple(steps)
+        self._outputs = tuple(slots[number] for number in outputs)
 
-    def get_neighbor_numbers(self) -> set[int]:
-        """Returns the numbers of all the node's neighbors."""
-        return set(neighbor.item for neighbor in self.neighbours)
+    def evaluate(self, inputs: Sequence[float]) -> list[float]:
+        """Returns the values of the output nodes given the values of the input nodes.
+
+        Preconditions:
+            - len(inputs) >= self.input_size
+
+        Args:
+            - inputs: The values of the input nodes, in order.
+        """
+        values = list(inputs[:self.input_size])
+        values.extend([0.0] * (self._slot_count - self.input_size))
+
+        for slot, sources, weights in self._steps:
+            value = 0.0
+            for source, weight in zip(sources, weights):
+                value += values[source] * weight
+            values[slot] = sigmoid(value)
+
+        return [values[slot] for slot in self._outputs]
 
 
 class NeuralNetGraph:
     """A directed acyclic graph class representing a neural network.
 
+    The nodes are numbered from 1 in the order they are added. The graph is stored compactly in
+    flat arrays rather than as vertex objects: the kind of each node, and the edges of every node
+    ordered by the number of their starting node, as is done for sparse matrices.
+
     Instance Attributes:
-        - input_nodes: A list of the input nodes of the neural network.
-        - output_nodes: A list of the output nodes of the neural network.
         - fitness: The fitness of the neural network implementation.
 
     Representation Invariants:
         - self.fitness >= 0
+        - len(self._rows) == len(self._kinds) + 1
+        - len(self._targets) == len(self._weights) == self._rows[-1]
     """
-    input_nodes: list[_WeightedVertex]
-    output_nodes: list[_WeightedVertex]
     fitness: float
 
     # Private Instance Attributes:
-    #  - _vertices : A mapping of the node's number to the vertex itself
-    _vertices: dict[int, _WeightedVertex]
-
-    def __init__(self, input_size: int, output_size: int, hidden_size: int = 1) -> None:
-        """Initialize a graph with given amount of each node types.
+    #  - _kinds : The position in NODE_KINDS of the kind of each node, stored at its number - 1.
+    #            This and the next two arrays may be shared with neural nets of the same shape.
+    #  - _rows : The edges starting at each node are stored from position _rows[number - 1] up to
+    #            _rows[number] in the arrays of edges.
+    #  - _targets : The number of the ending node of each edge.
+    #  - _weights : The weight of each edge.
+    #  - _compiled : The compiled evaluator of the network, or None if the network has changed
+    #                since it was last compiled.
+    _kinds: bytearray
+    _rows: array
+    _targets: array
+    _weights: array
+    _compiled: Optional[CompiledNetwork]
+
+    # Neural networks are kept by the thousands while training, so they have no __dict__.
+    __slots__ = ('fitness', '_kinds', '_rows', '_targets', '_weights', '_compiled')
+
+    def __init__(self, input_size: int, output_size: int, hidden_size: int = 1,
+                 rng: Optional[random.Random] = None) -> None:
+        """Initialize a graph with given amount of each node types, with random edge weights.
 
         Preconditions:
             - input_size >= 0
@@ -107,68 +182,58 @@ class NeuralNetGraph:
             - input_size: The amount of input nodes.
             - output_size: The amount of output nodes.
             - hidden_size: The amount of hidden nodes.
+            - rng: The random number generator for the edge weights, or a new unseeded one if None
+                   and there are edges to be weighted.
         """
-        self._vertices = {}
-
-        self.input_nodes = []
-        self.output_nodes = []
+        if rng is None and hidden_size > 0:
+            rng = random.Random()
         self.fitness = 0
-
-        # Add input nodes.
-        for _ in range(input_size):
-            self.add_input_node()
-
-        # Add and connect the hidden nodes.
-        hidden_nodes = []
-        for i in range(hidden_size):
-            hidden_nodes.append(self._vertices[self.add_hidden_node()])
-
-            for input_node in self.input_nodes:
-                hidden_nodes[i].neighbours[input_node] = random.uniform(-1, 1)
-
-        # Add and connect the output nodes.
-        for _ in range(output_size):
-            vertex = self._vertices[self.add_output_node()]
-
-            for hidden_node in hidden_nodes:
-                vertex.neighbours[hidden_node] = random.uniform(-1, 1)
+        self._compiled = None
+
+        # Add the input nodes, then each hidden node connected to every input node, then each
+        # output node connected to every hidden node.
+        self._kinds = bytearray([INPUT] * input_size + [HIDDEN] * hidden_size +
+                                [OUTPUT] * output_size)
+        counts = [0] * input_size + [input_size] * hidden_size + [hidden_size] * output_size
+        self._rows = array('H', accumulate(counts, initial=0))
+        self._targets = array('H', list(range(1, input_size + 1)) * hidden_size +
+                              list(range(input_size + 1, input_size + hidden_size + 1)) *
+                              output_size)
+        self._weights = array('d', [rng.uniform(-1, 1) for _ in range(len(self._targets))])
 
     def add_input_node(self) -> int:
         """Add an input node to this graph and return the number.
 
         The new input node is not adjacent to any other vertices.
         """
-        num = len(self._vertices) + 1
-        new_vertex = _WeightedVertex(num, 'input')
-
-        self._vertices[num] = new_vertex
-        self.input_nodes.append(new_vertex)
-
-        return num
+        return self._add_node(INPUT)
 
     def add_hidden_node(self) -> int:
         """Add a hidden node to this graph and return the number.
 
         The new hidden node is not adjacent to any other vertices.
         """
-        num = len(self._vertices) + 1
-        new_vertex = _WeightedVertex(num, 'hidden')
-        self._vertices[num] = new_vertex
-
-        return num
+        return self._add_node(HIDDEN)
 
     def add_output_node(self) -> int:
         """Add an output node to this graph and return the number.
 
         The new output node is not adjacent to any other vertices.
         """
-        num = len(self._vertices) + 1
-        new_vertex = _WeightedVertex(num, 'output')
+        return self._add_node(OUTPUT)
+
+    def _add_node(self, kind: int) -> int:
+        """Add a node of the given kind to this graph and return the number.
 
-        self._vertices[num] = new_vertex
-        self.output_nodes.append(new_vertex)
+        Args:
+            - kind: The position in NODE_KINDS of the kind of node.
+        """
+        self._copy_topology()
+        self._kinds.append(kind)
+        self._rows.append(self._rows[-1])
+        self._compiled = None
 
-        return num
+        return len(self._kinds)
 
     def add_edge(self, number1: int, number2: int, weight: Union[int, float] = 1) -> None:
         """Add an edge between the two vertices with the given numbers in this graph,
@@ -187,118 +252,527 @@ class NeuralNetGraph:
             - number2: The number for the ending vertex.
             - weight: The weight of the new edge.
         """
-        if number1 in self._vertices and number2 in self._vertices:
-            v1 = self._vertices[number1]
-            v2 = self._vertices[number2]
-
-            # Add the new directed edge
-            v1.neighbours[v2] = weight
-        else:
+        if not (1 <= number1 <= len(self._kinds) and 1 <= number2 <= len(self._kinds)):
             # We didn't find an existing vertex for both items.
             raise ValueError
 
+        self._compiled = None
+        start, end = self._rows[number1 - 1], self._rows[number1]
+
+        # Replace the weight of an existing edge, or add the new directed edge.
+        for position in range(start, end):
+            if self._targets[position] == number2:
+                self._weights[position] = weight
+                return
+
+        self._copy_topology()
+        self._targets.insert(end, number2)
+        self._weights.insert(end, weight)
+        for number in range(number1, len(self._rows)):
+            self._rows[number] += 1
+
+    def _copy_topology(self) -> None:
+        """Copies the arrays of nodes and edges, which may be shared with other neural nets
+        made by with_weights, before they are changed.
+        """
+        self._kinds = bytearray(self._kinds)
+        self._rows = array('H', self._rows)
+        self._targets = array('H', self._targets)
+
     def get_weight(self, number1: int, number2: int) -> Union[int, float]:
         """Return the weight of the edge between the given numbers, from number1 to number2.
 
         Return 0 if number1 and number2 are not adjacent.
 
         Preconditions:
-            - number1 in self._vertices.keys()
-            - number2 in self._vertices.keys()
+            - 1 <= number1 <= len(self._kinds)
+            - 1 <= number2 <= len(self._kinds)
 
         Args:
             - number1: The number for the starting vertex.
             - number2: The number for the ending vertex.
         """
-        v1 = self._vertices[number1]
-        v2 = self._vertices[number2]
+        for neighbour, weight in self.get_edges(number1):
+            if neighbour == number2:
+                return weight
+
+        return 0
+
+    def get_edges(self, number: int) -> list[tuple[int, float]]:
+        """Return the ending node number and weight of each edge starting at the node with the
+        given number, in the order they were added.
+
+        Preconditions:
+            - 1 <= number <= len(self._kinds)
+
+        Args:
+            - number: The number of the starting vertex.
+        """
+        start, end = self._rows[number - 1], self._rows[number]
+        return list(zip(self._targets[start:end], self._weights[start:end]))
 
-        return v1.neighbours.get(v2, 0)
+    def get_numbers(self, kind: str) -> list[int]:
+        """Return the numbers of the nodes of the given kind, in order.
+
+        Preconditions:
+            - kind in NODE_KINDS
+
+        Args:
+            - kind: The kind of node, either 'input', 'hidden' or 'output'.
+        """
+        code = NODE_KINDS.index(kind)
+        return [number for number, node_kind in enumerate(self._kinds, 1) if node_kind == code]
 
     def get_connections(self) -> list[tuple[int, int, float]]:
-        """Return all the connections within the neural net.
+        """Return all the connections within the neural net, each listed once.
         Returns a list of tuples containing the initial node, the end node, and the weight of edge.
+
+        The edges are ordered by the number of their initial node, then by the order they were
+        added.
         """
-        out = []
-        for node in self.output_nodes:
-            out.extend(node.get_connections())
+        sources = [number for number in range(1, len(self._rows))
+                   for _ in range(self._rows[number] - self._rows[number - 1])]
+        return list(zip(sources, self._targets, self._weights))
 
-        return out
+    def get_input_count(self) -> int:
+        """Return the amount of input nodes in the neural net."""
+        return self._kinds.count(INPUT)
 
     def get_hidden_count(self) -> int:
         """Return the amount of hidden nodes in the neural net."""
-        return len(self._vertices) - len(self.input_nodes) - len(self.output_nodes)
+        return self._kinds.count(HIDDEN)
+
+    def get_output_count(self) -> int:
+        """Return the amount of output nodes in the neural net."""
+        return self._kinds.count(OUTPUT)
+
+    def compile(self) -> CompiledNetwork:
+        """Returns the compiled evaluator of the neural network, which is only compiled again
+        once an edge or node has been added since.
+        """
+        if self._compiled is None:
+            self._compiled = CompiledNetwork(self)
+
+        return self._compiled
+
+    def clear_compiled(self) -> None:
+        """Discards the compiled evaluator of the neural network, which holds a copy of every
+        weight, to free its memory once the network is no longer played.
+        """
+        self._compiled = None
+
+    def evaluate(self, inputs: Sequence[float]) -> list[float]:
+        """Returns the values of the output nodes given the values of the input nodes, using the
+        compiled evaluator of the neural network.
+
+        Preconditions:
+            - len(inputs) >= self.get_input_count()
+
+        Args:
+            - inputs: The values of the input nodes, in order.
+        """
+        return self.compile().evaluate(inputs)
 
-    def propagate_outputs(self) -> None:
-        """The main function to update all values for the output nodes."""
-        for node in self.output_nodes:
-            self._propagate_node(node, set())
+    def get_weights(self) -> np.ndarray:
+        """Returns a copy of the weights of every edge in the neural net as a contiguous array, in
+        the order of get_connections.
+        """
+        import numpy as np
+        return np.array(self._weights, dtype=float)
+
+    def with_weights(self, weights: np.ndarray) -> NeuralNetGraph:
+        """Returns a copy of the neural net with the same nodes and edges, but with the given edge
+        weights instead.
+
+        Preconditions:
+            - len(weights) == len(self.get_weights())
 
-    def _propagate_node(self, curr_node: _WeightedVertex, visited: set()) -> None:
-        """Updates the values of all nodes curr_node relies on, then updates its value.
+        Args:
+            - weights: The new weights of every edge, in the order of get_weights.
+        """
+        import numpy as np
 
-        Is a recursive helper function for propagate_outputs, relying on the natural base case
-        of the input nodes, given the neural network is a directed acyclic graph.
+        # The nodes and edges are shared until either neural net changes them.
+        network = NeuralNetGraph(0, 0, 0)
+        network._kinds = self._kinds
+        network._rows = self._rows
+        network._targets = self._targets
+        network._weights = array('d', np.ascontiguousarray(weights, dtype=float).tobytes())
+
+        return network
+
+    def snapshot(self, weight_format: str = 'd') -> bytes:
+        """Returns the neural network and its fitness packed into bytes, as stored in a network
+        file. The weights are stored as 64-bit floats if weight_format is 'd', or as 32-bit floats
+        if it is 'f', which halves their size but rounds them.
 
         Preconditions:
-            - curr_node.number not in visited
+            - weight_format in WEIGHT_FORMATS
 
         Args:
-            - curr_node: The current node to be updated.
-            - visited: The set of node numbers corresponding to already visited thus updated nodes.
+            - weight_format: The array type code the weights are stored as.
         """
-        # Input nodes as base case
-        if curr_node.kind == 'input':
-            return
+        weights = array(weight_format, self._weights)
+        sections = network_sections(len(self._kinds), len(weights), weights.itemsize)
+
+        data = bytearray(sections['weights'].stop)
+        NETWORK_HEADER.pack_into(data, 0, NETWORK_MAGIC, NETWORK_VERSION, NETWORK_BYTE_ORDER,
+                                 weight_format.encode(), len(self._kinds), len(weights),
+                                 self.fitness)
+        data[sections['kinds']] = self._kinds
+        data[sections['rows']] = self._rows.tobytes()
+        data[sections['targets']] = self._targets.tobytes()
+        data[sections['weights']] = weights.tobytes()
 
-        visited.add(curr_node.number)
-        value = 0
+        return bytes(data)
 
-        # Update all nodes curr_node relies on (The node's neighbors).
-        for node, weight in curr_node.neighbours.items():
-            if node.number not in visited:
-                self._propagate_node(node, visited)
-            value += node.value * weight
+    def restore(self, data: Union[bytes, mmap.mmap], offset: int = 0) -> int:
+        """Restores the neural network and its fitness from a snapshot packed in data at offset,
+        returning the offset following it.
 
-        # Sigmoid activation function!
-        curr_node.value = scipy.special.expit(value)
+        Raise a ValueError if there is no valid snapshot at offset, or if the snapshot was packed
+        on a machine with another byte order.
 
-    def get_mutated_child(self, best_fitness: float) -> NeuralNetGraph:
-        """Returns a copy of the graph with slightly mutated edge weights.
+        Args:
+            - data: The bytes containing the snapshot.
+            - offset: The position of the neural network's snapshot within data.
+        """
+        weight_format, node_count, edge_count, sections = \
+            network_layout(data[offset:offset + NETWORK_LAYOUT.size])
+        end = offset + sections['weights'].stop
+        if len(data) < end:
+            raise ValueError('The neural network snapshot is incomplete.')
+
+        # Slicing copies the snapshot out of an archive, but not out of bytes holding only the
+        # snapshot. Its small sections are then faster to copy out than to view.
+        snapshot = data[offset:end]
+        kinds, rows, targets = restore_topology(
+            snapshot[sections['kinds'].start:sections['targets'].stop], node_count, edge_count)
+        weights = array(weight_format)
+        weights.frombytes(snapshot[sections['weights']])
+
+        self.fitness = NETWORK_FITNESS.unpack_from(snapshot, NETWORK_LAYOUT.size)[0]
+        self._kinds = kinds
+        self._rows = rows
+        self._targets = targets
+        self._weights = weights if weight_format == 'd' else array('d', weights)
+        self._compiled = None
+
+        return end
+
+    def get_mutated_child(self, best_fitness: float, rng: random.Random) -> NeuralNetGraph:
+        """Returns a copy of the graph with slightly mutated edge weights, mutated by the factor
+        for best_fitness with a seed drawn from rng.
 
         Preconditions:
             - best_fitness >= 0
 
         Args:
             - best_fitness: The best fitness for the training.
+            - rng: The random number generator for the mutations.
+        """
+        return self.mutate(mutation_factor(best_fitness), rng.getrandbits(64))
+
+    def mutate(self, factor: float, seed: int) -> NeuralNetGraph:
+        """Returns a copy of the graph with slightly mutated edge weights. The same factor and
+        seed always give the same copy, so a child can be made again from its parent.
+
+        Each weight is either reset to a new random weight, or moved by random noise scaled by
+        factor and clamped, with the random values for every weight drawn at once from a NumPy
+        generator seeded by seed.
+
+        Preconditions:
+            - factor > 0
+            - seed >= 0
+
+        Args:
+            - factor: The modification factor of the noise.
+            - seed: The seed of the random values.
+        """
+        import numpy as np
+
+        weights = self.get_weights()
+        generator = np.random.default_rng(seed)
+        is_reset = generator.random(len(weights)) < const.RANDOM_CHANCE
+        noise = generator.standard_normal(len(weights))
+        resets = generator.uniform(-1, 1, len(weights))
+
+        # Mutate all connections at once
+        weights = np.where(is_reset, resets, np.clip(weights + factor * noise, -1, 1))
+        return self.with_weights(weights)
+
+
+def mutation_factor(best_fitness: float) -> float:
+    """Returns the modification factor of mutations given the best fitness for the training.
+    The factor depends on best fitness - better fitness, more precise mutations.
+
+    Preconditions:
+        - best_fitness >= 0
+
+    Args:
+        - best_fitness: The best fitness for the training.
+
+    >>> mutation_factor(0.0)
+    1.0
+    >>> mutation_factor(5000.0)
+    0.025
+    """
+    return 1 / (const.WEIGHT_CO - max(const.WEIGHT_OFFSET - best_fitness / const.FITNESS_CO, 0))
+
+
+@functools.lru_cache(maxsize=64)
+def network_sections(node_count: int, edge_count: int, weight_size: int) -> dict[str, slice]:
+    """Returns the byte range of each section of a neural network's snapshot with the given
+    sizes. Each section starts aligned after the header and previous section, in the order they
+    are returned.
+
+    The sections are cached, as neural networks mostly share their sizes, so the returned
+    dictionary must not be changed.
+
+    Args:
+        - node_count: The amount of nodes in the neural network.
+        - edge_count: The amount of edges in the neural network.
+        - weight_size: The amount of bytes each weight is stored in.
+
+    >>> network_sections(22, 86, 8)['weights']
+    slice(272, 960, None)
+    """
+    sizes = {'kinds': node_count,
+             'rows': 2 * (node_count + 1),
+             'targets': 2 * edge_count,
+             'weights': weight_size * edge_count}
+
+    sections = {}
+    start = NETWORK_HEADER.size
+    for name, size in sizes.items():
+        start += -start % NETWORK_ALIGNMENT
+        sections[name] = slice(start, start + size)
+        start += size
+
+    return sections
+
+
+@functools.lru_cache(maxsize=64)
+def network_layout(layout: bytes) -> tuple[str, int, int, dict[str, slice]]:
+    """Returns the weight format, amount of nodes, amount of edges and sections of a neural
+    network's snapshot, from the start of its header before the fitness.
+
+    Raise a ValueError if the header is incomplete or not valid, or if the snapshot was packed on
+    a machine with another byte order.
+
+    The layouts are cached, as neural networks mostly share their sizes, so the returned sections
+    must not be changed.
+
+    Args:
+        - layout: The start of the snapshot's header, before the fitness.
+    """
+    if len(layout) < NETWORK_LAYOUT.size:
+        raise ValueError('The neural network snapshot is incomplete.')
+
+    magic, version, byte_order, weight_format, node_count, edge_count = \
+        NETWORK_LAYOUT.unpack(layout)
+    weight_format = weight_format.decode('latin-1')
+    if magic != NETWORK_MAGIC or version != NETWORK_VERSION or \
+            byte_order != NETWORK_BYTE_ORDER or weight_format not in WEIGHT_FORMATS:
+        raise ValueError('The neural network snapshot is not valid.')
+
+    sections = network_sections(node_count, edge_count, array(weight_format).itemsize)
+    return weight_format, node_count, edge_count, sections
+
+
+@functools.lru_cache(maxsize=64)
+def restore_topology(topology: bytes, node_count: int,
+                     edge_count: int) -> tuple[bytearray, array, array]:
+    """Returns the node kinds, edge offsets and edge targets of a neural network with the given
+    sizes, from its snapshot's sections between the start of the kinds and the end of the targets.
+
+    Raise a ValueError if the edge offsets do not match the amount of edges.
+
+    The arrays are cached, as mutated neural networks share their nodes and edges, so they are
+    shared between the neural networks restored from them. Like the arrays shared by with_weights,
+    they are copied by a neural network before it changes them.
+
+    Args:
+        - topology: The snapshot's sections of node kinds, edge offsets and edge targets.
+        - node_count: The amount of nodes in the neural network.
+        - edge_count: The amount of edges in the neural network.
+    """
+    sections = network_sections(node_count, edge_count, 0)
+    start = sections['kinds'].start
+    kinds = bytearray(topology[:sections['kinds'].stop - start])
+    rows = array('H', topology[sections['rows'].start - start:sections['rows'].stop - start])
+    targets = array('H', topology[sections['targets'].start - start:])
+
+    if rows[0] != 0 or rows[-1] != edge_count:
+        raise ValueError('The neural network snapshot is not valid.')
+
+    return kinds, rows, targets
+
+
+def sigmoid(value: float) -> float:
+    """Returns the sigmoid activation function of value.
+
+    Args:
+        - value: The value to be activated.
+
+    >>> sigmoid(0.0)
+    0.5
+    >>> sigmoid(-1000.0)
+    0.0
+    """
+    try:
+        return 1 / (1 + math.exp(-value))
+    except OverflowError:
+        return 0.0
+
+
+class NetworkArchive:
+    """A class representing a network archive file, which stores many neural networks along with
+    an index of where each is stored. The file is mapped into memory rather than read, so that
+    each neural network is only loaded when asked for.
+
+    Instance Attributes:
+        - file_path: The path of the network archive file.
+
+    Representation Invariants:
+        - len(self._offsets) == self.get_count()
+    """
+    file_path: str
+
+    # Private Instance Attributes:
+    #  - _data : The contents of the network archive file mapped into memory.
+    #  - _offsets : The position within the file of each neural network's snapshot.
+    _data: mmap.mmap
+    _offsets: array
+
+    def __init__(self, file_path: str) -> None:
+        """Opens the network archive file at file_path.
+
+        Raise a ValueError if the file is not a valid network archive file, or if it was saved
+        on a machine with another byte order.
+
+        Preconditions:
+            - file_path is a valid path to a network archive file.
+
+        Args:
+            - file_path: The path of the network archive file.
+        """
+        self.file_path = file_path
+        with open(file_path, 'rb') as archive_file:
+            self._data = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._data) < ARCHIVE_HEADER.size:
+            self.close()
+            raise ValueError(f'{file_path} is not a valid network archive.')
+
+        magic, version, byte_order, count = ARCHIVE_HEADER.unpack_from(self._data)
+        index_end = ARCHIVE_HEADER.size + count * ARCHIVE_INDEX.size
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION or \
+                byte_order != NETWORK_BYTE_ORDER or len(self._data) < index_end:
+            self.close()
+            raise ValueError(f'{file_path} is not a valid network archive.')
+
+        self._offsets = array('Q')
+        self._offsets.frombytes(self._data[ARCHIVE_HEADER.size:index_end])
+
+    def get_count(self) -> int:
+        """Returns the amount of neural networks in the archive. """
+        return len(self._offsets)
+
+    def load(self, index: int) -> NeuralNetGraph:
+        """Returns the neural network at index within the archive, along with its fitness.
+
+        Raise a ValueError if the neural network stored at index is not valid.
+
+        Preconditions:
+            - 0 <= index < self.get_count()
+
+        Args:
+            - index: The position of the neural network within the archive.
         """
-        # Start making a copy of this neural network
-        new_network = NeuralNetGraph(len(self.input_nodes), len(self.output_nodes),
-                                     self.get_hidden_count())
-        # Modification factor depends on best fitness - better fitness, more precise mutations.
-        factor = 1 / (const.WEIGHT_CO - max(const.WEIGHT_OFFSET - best_fitness / const.FITNESS_CO,
-                                            0))
+        # Every attribute is set by restoring, so the constructor is skipped.
+        neural_net = NeuralNetGraph.__new__(NeuralNetGraph)
+        neural_net.restore(self._data, self._offsets[index])
+
+        return neural_net
 
-        # Add all connections with mutations
-        for v1, v2, weight in self.get_connections():
-            if random.uniform(0, 1) < const.RANDOM_CHANCE:
-                weight = random.uniform(-1, 1)
-            else:
-                weight = clamp(weight + factor * random.gauss(0, 1), -1, 1)
-            new_network.add_edge(v1, v2, weight)
+    def close(self) -> None:
+        """Closes the network archive file. No more neural networks may be loaded from it. """
+        self._data.close()
 
-        return new_network
+    def __enter__(self) -> NetworkArchive:
+        """Returns the network archive, to be closed once the with statement is exited. """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Closes the network archive file when exiting the with statement. """
+        self.close()
+
+
+def save_network_archive(networks: Sequence[NeuralNetGraph], file_path: str,
+                         weight_format: str = 'd') -> None:
+    """Saves the neural networks along with their fitness together as a network archive file.
+
+    Preconditions:
+        - file_path is a valid path for a network archive file, which may or may not exist yet.
+        - weight_format in WEIGHT_FORMATS
+
+    Args:
+        - networks: The neural networks to be saved, in order.
+        - file_path: The path for the network archive file.
+        - weight_format: The array type code the weights are stored as.
+    """
+    snapshots = [neural_net.snapshot(weight_format) for neural_net in networks]
+
+    # Each snapshot starts aligned after the header, index and previous snapshot.
+    offsets = array('Q')
+    start = ARCHIVE_HEADER.size + len(snapshots) * ARCHIVE_INDEX.size
+    for snapshot in snapshots:
+        start += -start % NETWORK_ALIGNMENT
+        offsets.append(start)
+        start += len(snapshot)
+
+    data = bytearray(start)
+    ARCHIVE_HEADER.pack_into(data, 0, ARCHIVE_MAGIC, ARCHIVE_VERSION, NETWORK_BYTE_ORDER,
+                             len(snapshots))
+    data[ARCHIVE_HEADER.size:ARCHIVE_HEADER.size + len(offsets) * ARCHIVE_INDEX.size] = \
+        offsets.tobytes()
+    for offset, snapshot in zip(offsets, snapshots):
+        data[offset:offset + len(snapshot)] = snapshot
+
+    with open(file_path, 'wb') as archive_file:
+        archive_file.write(data)
 
 
 def load_neural_network(file_path: str) -> NeuralNetGraph:
-    """Returns neural network from the csv file at file_path.
+    """Returns neural network from the csv file or network file at file_path, which is read as a
+    network file if it has the .pnet extension.
+
+    Raise a ValueError if a network file is not valid.
 
     Preconditions:
-        - file_path is a valid path to a csv file.
+        - file_path is a valid path to a csv file or a network file.
 
     Args:
-        - file_path: The path for a csv file storing the neural network representation.
+        - file_path: The path for a file storing the neural network representation.
     """
+    if file_path.endswith('.pnet'):
+        # Network files are read with a single call unless they are larger than the read size,
+        # so that most loads do not need to look up the size of the file first.
+        descriptor = os.open(file_path, os.O_RDONLY)
+        try:
+            data = os.read(descriptor, NETWORK_READ_SIZE)
+            if len(data) == NETWORK_READ_SIZE:
+                data += os.read(descriptor, os.fstat(descriptor).st_size)
+        finally:
+            os.close(descriptor)
+
+        # Every attribute is set by restoring, so the constructor is skipped.
+        neural_net = NeuralNetGraph.__new__(NeuralNetGraph)
+        if neural_net.restore(data) != len(data):
+            raise ValueError(f'{file_path} is not a valid network file.')
+        return neural_net
+
     with open(file_path) as csv_file:
         reader = csv.reader(csv_file)
         initial_sizes = next(reader)
@@ -314,20 +788,30 @@ def load_neural_network(file_path: str) -> NeuralNetGraph:
         return neural_net
 
 
-def save_neural_network(neural_net: NeuralNetGraph, file_path: str) -> None:
-    """Saves the neural network as a csv file.
+def save_neural_network(neural_net: NeuralNetGraph, file_path: str,
+                        weight_format: str = 'd') -> None:
+    """Saves the neural network as a csv file, or as a network file along with its fitness if
+    file_path has the .pnet extension.
 
     Preconditions:
-        - file_path is a valid path for a csv file, which may or may not exist yet.
+        - file_path is a valid path for a csv file or network file, which may or may not exist
+          yet.
+        - weight_format in WEIGHT_FORMATS
 
     Args:
         - neural_net: The neural network to be saved.
-        - file_path: The path for a csv file storing the neural network representation.
+        - file_path: The path for a file storing the neural network representation.
+        - weight_format: The array type code the weights of a network file are stored as.
     """
+    if splitext(file_path)[1] == '.pnet':
+        with open(file_path, 'wb') as network_file:
+            network_file.write(neural_net.snapshot(weight_format))
+        return
+
     with open(file_path, 'w+', newline='') as csv_file:
         writer = csv.writer(csv_file, delimiter=',')
         # Output the sizes of the node types.
-        connections = [(len(neural_net.input_nodes), len(neural_net.output_nodes),
+        connections = [(neural_net.get_input_count(), neural_net.get_output_count(),
                         neural_net.get_hidden_count())]
 
         # Write the connections.
@@ -337,8 +821,10 @@ def save_neural_network(neural_net: NeuralNetGraph, file_path: str) -> None:
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['csv', 'random', 'scipy.special', 'ai_constants', 'helpers'],
-        'allowed-io': ['load_neural_network', 'save_neural_network'],
+        'extra-imports': ['array', 'csv', 'functools', 'itertools', 'math', 'mmap', 'os', 'os.path',
+                          'random', 'struct', 'numpy', 'ai_constants'],
+        'allowed-io': ['load_neural_network', 'save_neural_network', 'save_network_archive',
+                       'NetworkArchive.__init__'],
         'max-line-length': 100,
         'disable': ['E1136', 'E1101']
     })
@@ -5,13 +5,15 @@ Module with containing the AITree and AITrainer classes for training of the AIs.
 from __future__ import annotations
 
 from typing import Any, Optional
+from collections import OrderedDict
 from os.path import isfile
 import atexit
 import math
 import random
 
 from ai_controls import AIController
-from ai_neural_net import NeuralNetGraph, load_neural_network, save_neural_network
+from ai_neural_net import NeuralNetGraph, load_neural_network, mutation_factor, \
+    save_neural_network
 import ai_constants as const
 import game_runner
 
@@ -19,9 +21,15 @@ import game_runner
 class AITree:
     """A tree class representing the AIs simulated.
 
+    Each tree may keep only the lineage of its neural net, being the modification factor and
+    seed of the mutation which made it from its parent's neural net, with the neural net itself
+    kept in a bounded cache shared by the whole tree and made again whenever needed. The overall
+    best neural net is always kept.
+
     Instance Attributes:
-        - neural_net: The neural net corresponding to this tree's root value.
-        - best_descendant: The best neural network from this tree's root value or descendants.
+        - fitness: The fitness of this tree's root value.
+        - best_descendant: The tree whose root value is the best neural network from this tree's
+                           root value or descendants.
         - total_fitness: The total fitness of this tree's root value and descendants.
         - descendant_count: The amount of descendants for this tree.
         - enabled: Whether this tree is active.
@@ -29,12 +37,13 @@ class AITree:
     Representation Invariants:
         - self.total_fitness >= 0
         - self.descendant_count >= 0
+        - self._neural_net is not None or self._mutation is not None
 
         - self.descendant_count, self.total_fitness, self.best_descendant match with their
           descriptions relative to the root value and descendants of this tree
     """
-    neural_net: NeuralNetGraph
-    best_descendant: NeuralNetGraph
+    fitness: float
+    best_descendant: AITree
     total_fitness: float
     descendant_count: int
     enabled: bool
@@ -43,23 +52,83 @@ class AITree:
     #  - _parent : The parent of this tree. If equal to None, this indicates this is the overall
     #              root.
     #  - _subtrees : The list of this tree's subtrees.
+    #  - _neural_net : The neural net which is this tree's root value, or None if it is only
+    #                  kept by the cache.
+    #  - _mutation : The modification factor and seed of the mutation which made this tree's
+    #                neural net from its parent's, or None if it was not made by a mutation.
+    #  - _cache : The cache of neural nets of the trees which only keep their lineage, or None
+    #             if every tree keeps its neural net.
     _parent: Optional[AITree]
     _subtrees: list[AITree]
+    _neural_net: Optional[NeuralNetGraph]
+    _mutation: Optional[tuple[float, int]]
+    _cache: Optional[NetworkCache]
+
+    # Training may keep millions of trees, so they have no __dict__.
+    __slots__ = ('fitness', 'best_descendant', 'total_fitness', 'descendant_count', 'enabled',
+                 '_parent', '_subtrees', '_neural_net', '_mutation', '_cache')
 
-    def __init__(self, neural_net: NeuralNetGraph) -> None:
+    def __init__(self, neural_net: NeuralNetGraph, cache: Optional[NetworkCache] = None,
+                 mutation: Optional[tuple[float, int]] = None) -> None:
         """Makes new AI Tree from neural network assuming simulation has already ran on network.
 
+        Preconditions:
+            - mutation is None or the tree is added as a subtree of the neural net's parent
+
         Args:
             - neural_net: The neural network which is this tree's root value.
+            - cache: The cache of neural nets for trees which only keep their lineage, or None
+                     for the tree to keep its neural net.
+            - mutation: The modification factor and seed of the mutation which made the neural
+                        network from its parent's, or None if it was not made by a mutation.
         """
-        self.neural_net = neural_net
-        self.best_descendant = neural_net
+        # Only the compact storage of the neural net is kept once it has been simulated.
+        neural_net.clear_compiled()
+        self.fitness = neural_net.fitness
+        self.best_descendant = self
         self.total_fitness = neural_net.fitness
         self.descendant_count = 0
         self.enabled = True
 
         self._parent = None
         self._subtrees = []
+        self._mutation = mutation
+        self._cache = cache
+
+        if cache is None or mutation is None:
+            self._neural_net = neural_net
+        else:
+            self._neural_net = None
+            cache.add(self, neural_net)
+
+    def get_neural_net(self) -> NeuralNetGraph:
+        """Returns the neural net which is this tree's root value. If the neural net is not kept,
+        it is made again by repeating the mutations from the closest ancestor whose neural net is
+        kept, caching every neural net made along the way.
+        """
+        lineage = []
+        tree = self
+        neural_net = tree._get_kept_neural_net()
+        while neural_net is None:
+            lineage.append(tree)
+            tree = tree._parent
+            neural_net = tree._get_kept_neural_net()
+
+        for tree in reversed(lineage):
+            neural_net = neural_net.mutate(*tree._mutation)
+            neural_net.fitness = tree.fitness
+            tree._cache.add(tree, neural_net)
+
+        return neural_net
+
+    def _get_kept_neural_net(self) -> Optional[NeuralNetGraph]:
+        """Returns the neural net which is this tree's root value if it is kept by the tree or
+        the cache, or None otherwise.
+        """
+        if self._neural_net is None:
+            return self._cache.get(self)
+        else:
+            return self._neural_net
 
     def get_subtrees(self) -> list[AITree]:
         """Returns all this tree's subtrees"""
@@ -80,14 +149,17 @@ class AITree:
         """Returns whether or not this tree is a leaf."""
         return self._subtrees == []
 
-    def add_subtree(self, neural_net: NeuralNetGraph) -> None:
+    def add_subtree(self, neural_net: NeuralNetGraph,
+                    mutation: Optional[tuple[float, int]] = None) -> None:
         """Adds a neural network to this tree as a subtree, then updates information to maintain
         the representation invariants.
 
         Args:
             - neural_net: The neural network to be added.
+            - mutation: The modification factor and seed of the mutation which made the neural
+                        network from this tree's, or None if it was not made by a mutation.
         """
-        subtree = AITree(neural_net)
+        subtree = AITree(neural_net, self._cache, mutation)
         self._subtrees.append(subtree)
         subtree.set_parent(self)
 
@@ -109,25 +181,45 @@ class AITree:
 
         # Replace best_descendant if the subtree's was better
         if subtree.best_descendant.fitness > self.best_descendant.fitness:
+            previous = self.best_descendant
             self.best_descendant = subtree.best_descendant
 
+            if self._parent is None:
+                self.keep_best_descendant(previous)
+
         # Continue to recurse until root of overall tree
         if self._parent is not None:
             self._parent.recurse_update_fitness(subtree)
 
-    def choose_next_parent(self) -> AITree:
-        """Returns the next parent using a Monte Carlo Tree Search type algorithm."""
+    def keep_best_descendant(self, previous: AITree) -> None:
+        """Keeps the neural net of this tree's best descendant, so that it is never made again,
+        and stops keeping the neural net of the previous best descendant if it can be.
+
+        Args:
+            - previous: The previous best descendant of this tree.
+        """
+        self.best_descendant._neural_net = self.best_descendant.get_neural_net()
+
+        if previous._cache is not None and previous._mutation is not None:
+            previous._neural_net = None
+
+    def choose_next_parent(self, rng: random.Random) -> AITree:
+        """Returns the next parent using a Monte Carlo Tree Search type algorithm.
+
+        Args:
+            - rng: The random number generator used to decide on expansion.
+        """
         if self.is_leaf():
             return self
         else:
             # Expansion by adding new subtree
-            if random.uniform(0, 1) < const.EXPANSION_CHANCE / len(self._subtrees):
+            if rng.uniform(0, 1) < const.EXPANSION_CHANCE / len(self._subtrees):
                 return self
             else:
                 # Chooses best tree based on heuristic,then recurses to find the best tree
                 # to return.
                 max_tree = max(self._subtrees, key=self.exploration_heuristic)
-                return max_tree.choose_next_parent()
+                return max_tree.choose_next_parent(rng)
 
     def exploration_heuristic(self, subtree: AITree) -> float:
         """Returns heuristic value of given subtree, using formula based on commonly used
@@ -172,6 +264,63 @@ class AITree:
             subtree.extinction()
 
 
+class NetworkCache:
+    """A class representing a bounded cache of the neural nets of AI trees which only keep their
+    lineage. Once full, the least recently used neural net is dropped, so that the recently
+    selected parents and their new children are kept while the rest are made again if needed.
+
+    Instance Attributes:
+        - capacity: The most neural nets kept by the cache.
+
+    Representation Invariants:
+        - self.capacity >= 1
+        - len(self._networks) <= self.capacity
+    """
+    capacity: int
+
+    # Private Instance Attributes:
+    #  - _networks : The neural net kept for each tree, from least to most recently used.
+    _networks: OrderedDict[AITree, NeuralNetGraph]
+
+    def __init__(self, capacity: int) -> None:
+        """Initializes an empty cache.
+
+        Preconditions:
+            - capacity >= 1
+
+        Args:
+            - capacity: The most neural nets kept by the cache.
+        """
+        self.capacity = capacity
+        self._networks = OrderedDict()
+
+    def get(self, tree: AITree) -> Optional[NeuralNetGraph]:
+        """Returns the neural net kept for the tree, or None if it is not kept.
+
+        Args:
+            - tree: The tree whose neural net is returned.
+        """
+        neural_net = self._networks.get(tree)
+        if neural_net is not None:
+            self._networks.move_to_end(tree)
+
+        return neural_net
+
+    def add(self, tree: AITree, neural_net: NeuralNetGraph) -> None:
+        """Keeps the neural net for the tree, dropping the least recently used neural net if the
+        cache is full.
+
+        Args:
+            - tree: The tree whose neural net is kept.
+            - neural_net: The neural net to be kept.
+        """
+        self._networks[tree] = neural_net
+        self._networks.move_to_end(tree)
+
+        if len(self._networks) > self.capacity:
+            self._networks.popitem(last=False)
+
+
 class AITrainer:
     """A class used to train the AIs using the AI tree system.
 
@@ -182,6 +331,8 @@ class AITrainer:
         - game: The game used to simulate the results.
         - training_stage: The stage of training the trainer is on.
         - has_won: Whether there has been a winning instance.
+        - random: The random number generator for selection, mutations and the seeds of the
+                  simulated games, which makes training reproducible when seeded.
 
     Representation Invariants:
         - self.best_fitness[0] >= 0 and self.best_fitness[1] >= 0
@@ -194,9 +345,14 @@ class AITrainer:
     game: game_runner.Game
     training_stage: int
     has_won: bool
+    random: random.Random
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        """Initializes a trainer object.
 
-    def __init__(self) -> None:
-        """Initializes a trainer object."""
+        Args:
+            - seed: The random seed for the training, or None for an unseeded trainer.
+        """
         self.ai_tree = None
         self.best_fitness = (0.0, 0)
         self.rolling_avg = []
@@ -204,17 +360,27 @@ class AITrainer:
 
         self.training_stage = const.TRAVERSAL_STAGE
         self.has_won = False
+        self.random = random.Random(seed)
 
     def start_training(self, input_path: Optional[str] = None, output_path: Optional[str] = None,
-                       starting_stage: int = const.GHOST_STAGE, is_visual: bool = False) -> None:
+                       starting_stage: int = const.GHOST_STAGE, is_visual: bool = False,
+                       render_fps: Optional[int] = None, cache_size: Optional[int] = None) -> None:
         """Starts the training of AI at given stage. Takes initial neural network from input_path,
         and outputs to output_path. May be done with visualization.
 
+        Preconditions:
+            - render_fps is None or render_fps > 0
+            - cache_size is None or cache_size >= 1
+
         Args:
             - input_path: The path for the initial neural network saved as a csv file.
             - output_path: The path for the output of the training to go, as a csv file.
             - starting_stage: The stage to start training from.
             - is_visual: Whether or not to show visualizations.
+            - render_fps: The frame rate to draw visualizations at while simulating at full
+                          speed, or None to simulate in real time.
+            - cache_size: The most neural networks cached for the AI tree, whose trees then only
+                          keep their lineage, or None for every tree to keep its neural network.
         """
         # Reset values for each training
         self.training_stage = starting_stage
@@ -226,8 +392,12 @@ class AITrainer:
         if input_path is not None and isfile(input_path):
             initial_net = load_neural_network(input_path)
         else:
-            initial_net = NeuralNetGraph(const.INPUT_SIZE, const.OUTPUT_SIZE, const.HIDDEN_SIZE)
-        self.ai_tree = AITree(initial_net)
+            initial_net = NeuralNetGraph(const.INPUT_SIZE, const.OUTPUT_SIZE, const.HIDDEN_SIZE,
+                                         self.random)
+        if cache_size is None:
+            self.ai_tree = AITree(initial_net)
+        else:
+            self.ai_tree = AITree(initial_net, NetworkCache(cache_size))
 
         # Remember to save on exit!
         atexit.register(self.on_exit, output_path)
@@ -235,7 +405,7 @@ class AITrainer:
         iteration = 0
         while not self.has_won:
             # Configure training stage
-            config = {'is_visual': is_visual}
+            config = {'is_visual': is_visual, 'render_fps': render_fps}
             if self.training_stage == const.TRAVERSAL_STAGE:
                 config['has_ghosts'] = False
                 config['has_boosts'] = False
@@ -247,14 +417,16 @@ class AITrainer:
                 config['lives'] = 1
 
             # Selection and Expansion step for iteration
-            parent = self.ai_tree.choose_next_parent()
-            neural_net = parent.neural_net.get_mutated_child(self.ai_tree.best_descendant.fitness)
+            parent = self.ai_tree.choose_next_parent(self.random)
+            factor = mutation_factor(self.ai_tree.best_descendant.fitness)
+            seed = self.random.getrandbits(64)
+            neural_net = parent.get_neural_net().mutate(factor, seed)
 
             # Start simulation step for iteration
             if self.simulate(neural_net, config):
                 break
             # Backpropagation step for iteration
-            parent.add_subtree(neural_net)
+            parent.add_subtree(neural_net, (factor, seed))
             self.rolling_avg.append(neural_net.fitness)
 
             # Update rolling average
@@ -285,7 +457,7 @@ class AITrainer:
             - graph_path: The path for the output of the training to go, as a csv file.
         """
         if graph_path is not None:
-            save_neural_network(self.ai_tree.best_descendant, graph_path)
+            save_neural_network(self.ai_tree.best_descendant.get_neural_net(), graph_path)
             print('Saved!')
 
     def simulate(self, network: NeuralNetGraph, config: Optional[dict[str, Any]] = None) -> bool:
@@ -295,7 +467,8 @@ class AITrainer:
             - network: The neural network to simulate.
             - config: The configuration dictionary for simulations.
         """
-        outcome = self.game.run(player_controller=AIController, neural_net=network, config=config)
+        outcome = self.game.run(player_controller=AIController, neural_net=network,
+                                seed=self.next_seed(), config=config)
 
         if outcome.pop('force_quit'):
             return True
@@ -305,13 +478,20 @@ class AITrainer:
             self.training_stage += 1
 
         self.has_won = outcome['game_win'] and self.training_stage >= const.BOOST_STAGE
-        network.fitness = self.fitness(**outcome)
+        network.fitness = self.fitness(outcome['game_win'], outcome['score'],
+                                       outcome['time_alive'])
 
         if not config['is_visual']:
             self.non_visual_output(outcome, network.fitness)
 
         return False
 
+    def next_seed(self) -> int:
+        """Returns the seed for the next simulated game, drawn from the trainer's own random
+        number generator.
+        """
+        return self.random.getrandbits(32)
+
     def non_visual_output(self, outcome: dict[str, Any], fitness: int) -> None:
         """Outputs useful information in console for non-visual training.
 
@@ -324,7 +504,7 @@ class AITrainer:
         print('Training Stage:', self.training_stage)
 
         print('Has Won:', outcome['game_win'], 'Score:', outcome['score'], 'Time Alive:',
-              outcome['time_alive'])
+              outcome['time_alive'], 'Pellets Left:', outcome['pellets_left'])
         print('Simulation Fitness:', fitness)
 
     @staticmethod
@@ -343,8 +523,8 @@ class AITrainer:
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['atexit', 'math', 'os.path', 'random', 'ai_constants', 'ai_controls',
-                          'ai_neural_net', 'game_runner'],
+        'extra-imports': ['atexit', 'collections', 'math', 'os.path', 'random', 'ai_constants',
+                          'ai_controls', 'ai_neural_net', 'game_runner'],
         'allowed-io': ['on_exit', 'non_visual_output'],
         'max-line-length': 100,
         'disable': ['E1136', 'E1101', 'E1123']  # PyTa doesn't recognize popping of 'force_quit'
@@ -0,0 +1,194 @@
+"""CSC111 Final Project
+
+Module for benchmarking the performance of the simulations, which is run manually.
+"""
+from os.path import join
+from tempfile import TemporaryDirectory
+from typing import Optional
+import random
+import time
+import tracemalloc
+
+import ai_controls
+import ai_neural_net
+import ai_trainer
+import game_runner
+
+
+def benchmark_ticks(network_path: str = 'data/test.csv', runs: int = 20) -> float:
+    """Returns the amount of ticks simulated per second by headless games played by the AI.
+
+    Preconditions:
+        - runs > 0
+
+    Args:
+        - network_path: The path for the csv file storing the neural network to play with.
+        - runs: The amount of games to be simulated.
+    """
+    game = game_runner.Game('data/map.csv')
+    neural_net = ai_neural_net.load_neural_network(network_path)
+
+    ticks = 0
+    start = time.perf_counter()
+    for seed in range(runs):
+        game.run(player_controller=ai_controls.AIController, neural_net=neural_net, seed=seed,
+                 config={'is_visual': False})
+        ticks += game.state.player().ticks_alive
+
+    return ticks / (time.perf_counter() - start)
+
+
+def benchmark_forward_passes(network_path: str = 'data/test.csv', passes: int = 20000,
+                             seed: int = 0) -> float:
+    """Returns the amount of forward passes per second through the neural network, given
+    random input values.
+
+    Preconditions:
+        - passes > 0
+
+    Args:
+        - network_path: The path for the csv file storing the neural network to propagate.
+        - passes: The amount of forward passes to be timed.
+        - seed: The seed of the random input values.
+    """
+    neural_net = ai_neural_net.load_neural_network(network_path)
+    rng = random.Random(seed)
+    inputs = [[rng.uniform(0, 1) for _ in range(neural_net.get_input_count())]
+              for _ in range(passes)]
+
+    start = time.perf_counter()
+    for values in inputs:
+        neural_net.evaluate(values)
+
+    return passes / (time.perf_counter() - start)
+
+
+def benchmark_mutations(network_path: str = 'data/test.csv', children: int = 2000,
+                        seed: int = 0) -> float:
+    """Returns the amount of mutated children of the neural network produced per second.
+
+    Preconditions:
+        - children > 0
+
+    Args:
+        - network_path: The path for the csv file storing the neural network to mutate.
+        - children: The amount of children to be produced.
+        - seed: The seed of the mutations.
+    """
+    neural_net = ai_neural_net.load_neural_network(network_path)
+    rng = random.Random(seed)
+
+    start = time.perf_counter()
+    for _ in range(children):
+        neural_net.get_mutated_child(0.0, rng)
+
+    return children / (time.perf_counter() - start)
+
+
+def benchmark_tree_memory(network_path: str = 'data/test.csv', nodes: int = 10000,
+                          seed: int = 0, cache_size: Optional[int] = None) -> float:
+    """Returns the amount of bytes of memory kept per node of an AI tree, each holding a mutated
+    child of the neural network.
+
+    Preconditions:
+        - nodes > 0
+        - cache_size is None or cache_size >= 1
+
+    Args:
+        - network_path: The path for the csv file storing the neural network to mutate.
+        - nodes: The amount of nodes added to the tree.
+        - seed: The seed of the mutations.
+        - cache_size: The most neural networks cached for the tree, whose nodes then only keep
+                      their lineage, or None for every node to keep its neural network.
+    """
+    neural_net = ai_neural_net.load_neural_network(network_path)
+    factor = ai_neural_net.mutation_factor(0.0)
+    rng = random.Random(seed)
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    if cache_size is None:
+        tree = ai_trainer.AITree(neural_net)
+    else:
+        tree = ai_trainer.AITree(neural_net, ai_trainer.NetworkCache(cache_size))
+
+    for _ in range(nodes):
+        mutation_seed = rng.getrandbits(64)
+        tree.add_subtree(neural_net.mutate(factor, mutation_seed), (factor, mutation_seed))
+    memory = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    return memory / nodes
+
+
+def benchmark_network_loads(network_path: str = 'data/test.csv', loads: int = 2000,
+                            extension: str = '.csv') -> float:
+    """Returns the amount of neural networks loaded per second, after saving the neural network
+    as a file with the given extension. Networks are loaded from a network archive file by
+    opening it once, and then loading its networks in turn.
+
+    Preconditions:
+        - loads > 0
+        - extension in {'.csv', '.pnet', '.pnets'}
+
+    Args:
+        - network_path: The path for the csv file storing the neural network to load.
+        - loads: The amount of neural networks to be loaded.
+        - extension: The extension of the file type to load neural networks from.
+    """
+    neural_net = ai_neural_net.load_neural_network(network_path)
+
+    with TemporaryDirectory() as directory:
+        file_path = join(directory, 'network' + extension)
+        if extension == '.pnets':
+            ai_neural_net.save_network_archive([neural_net] * 100, file_path)
+        else:
+            ai_neural_net.save_neural_network(neural_net, file_path)
+
+        start = time.perf_counter()
+        if extension == '.pnets':
+            with ai_neural_net.NetworkArchive(file_path) as archive:
+                for index in range(loads):
+                    archive.load(index % archive.get_count())
+        else:
+            for _ in range(loads):
+                ai_neural_net.load_neural_network(file_path)
+
+        return loads / (time.perf_counter() - start)
+
+
+def print_benchmarks() -> None:
+    """Prints the results of every benchmark in this module. """
+    print(f'Simulation: {benchmark_ticks():.0f} ticks/sec')
+    print(f'Neural network: {benchmark_forward_passes():.0f} forward passes/sec')
+    print(f'Mutation: {benchmark_mutations():.0f} children/sec')
+    print(f'AI tree memory: {benchmark_tree_memory():.0f} bytes/node at 10k nodes, '
+          f'{benchmark_tree_memory(nodes=100000):.0f} bytes/node at 100k nodes')
+    print(f'AI tree lineage memory: {benchmark_tree_memory(cache_size=1000):.0f} bytes/node at '
+          f'10k nodes, {benchmark_tree_memory(nodes=100000, cache_size=1000):.0f} bytes/node at '
+          f'100k nodes')
+    csv_loads = benchmark_network_loads()
+    network_loads = benchmark_network_loads(extension='.pnet')
+    print(f'Network loading: {csv_loads:.0f} csv files/sec, {network_loads:.0f} network '
+          f'files/sec ({network_loads / csv_loads:.0f}x), '
+          f'{benchmark_network_loads(extension=".pnets"):.0f} archived networks/sec')
+
+
+if __name__ == '__main__':
+    print_benchmarks()
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['os.path', 'tempfile', 'random', 'time', 'tracemalloc', 'ai_controls',
+                          'ai_neural_net', 'ai_trainer', 'game_runner'],
+        'allowed-io': ['print_benchmarks'],
+        'max-line-length': 100,
+        'disable': ['E1136']
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,42 @@
+"""CSC111 Final Project
+
+Module containing functions for detecting collisions between actors with integer arithmetic,
+matching the collisions of the actors' pygame rectangles without constructing them.
+"""
+import game_constants as const
+
+
+def is_colliding(x1: float, y1: float, x2: float, y2: float) -> bool:
+    """Returns whether actors with positions (x1, y1) and (x2, y2) collide, which is when their
+    tile-sized bounding squares overlap. Positions are truncated like pygame rectangles do, so
+    this is the same as colliding the actors' rectangles.
+
+    Args:
+        - x1: The x-coordinate of the first actor's position.
+        - y1: The y-coordinate of the first actor's position.
+        - x2: The x-coordinate of the second actor's position.
+        - y2: The y-coordinate of the second actor's position.
+
+    >>> is_colliding(0.0, 0.0, 15.9, 15.9)
+    True
+    >>> is_colliding(0.0, 0.0, 16.0, 0.0)
+    False
+    """
+    return abs(int(x1) - int(x2)) < const.TILE_SIZE.x and \
+        abs(int(y1) - int(y2)) < const.TILE_SIZE.y
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['game_constants'],
+        'max-line-length': 100,
+        'disable': ['E1136']
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
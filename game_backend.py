@@ -0,0 +1,125 @@
+"""CSC111 Final Project
+
+Module containing the Backend classes through which games handle their input, timing and
+drawing. The headless backend does not need pygame, which is only loaded for visual games.
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+# Only imports when type-checking to avoid circular import issues
+if TYPE_CHECKING:
+    from game_map import GameMap
+    from game_state import GameState
+
+
+# Input events which are not the direction of an arrow key pressed
+QUIT_EVENT = 'quit'
+KEY_EVENT = 'key'
+
+
+class Backend:
+    """An abstract class representing the platform a game runs on, which handles its input,
+    timing and drawing.
+    """
+
+    def open(self) -> None:
+        """Prepares the backend for a new game. """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """Clears what has been drawn, so that the next frame is drawn in full. """
+        raise NotImplementedError
+
+    def is_displayed(self) -> bool:
+        """Returns whether or not the game is shown on a display. """
+        raise NotImplementedError
+
+    def get_events(self) -> list[str]:
+        """Returns the input events since the last call. Each event is the direction of an arrow
+        key pressed, KEY_EVENT for other keys pressed, or QUIT_EVENT if the game is closed.
+        """
+        raise NotImplementedError
+
+    def get_time(self) -> int:
+        """Returns the time in milliseconds since the backend started. """
+        raise NotImplementedError
+
+    def tick(self, fps: int) -> None:
+        """Waits until a tick has passed since the last call, at fps ticks per second.
+
+        Preconditions:
+            - fps > 0
+
+        Args:
+            - fps: The amount of ticks per second.
+        """
+        raise NotImplementedError
+
+    def draw(self, state: GameState, grid: GameMap, is_debug: bool = False) -> None:
+        """Draws the game with given state and map.
+
+        Args:
+            - state: The state of the game.
+            - grid: The map of the game tiles.
+            - is_debug: Whether to draw debug information or not.
+        """
+        raise NotImplementedError
+
+
+class HeadlessBackend(Backend):
+    """A class representing the backend of a game without a display, which has no input and
+    runs as fast as possible.
+    """
+
+    def open(self) -> None:
+        """Prepares the backend for a new game. Not needed for this backend! """
+
+    def clear(self) -> None:
+        """Clears what has been drawn. Not needed for this backend! """
+
+    def is_displayed(self) -> bool:
+        """Returns whether or not the game is shown on a display, which it never is. """
+        return False
+
+    def get_events(self) -> list[str]:
+        """Returns the input events since the last call, of which there are none. """
+        return []
+
+    def get_time(self) -> int:
+        """Returns the time in milliseconds since the backend started, which is always 0 as the
+        game is not shown in real time.
+        """
+        return 0
+
+    def tick(self, fps: int) -> None:
+        """Waits until a tick has passed since the last call. Not needed for this backend!
+
+        Args:
+            - fps: The amount of ticks per second.
+        """
+
+    def draw(self, state: GameState, grid: GameMap, is_debug: bool = False) -> None:
+        """Draws the game with given state and map. Not needed for this backend!
+
+        Args:
+            - state: The state of the game.
+            - grid: The map of the game tiles.
+            - is_debug: Whether to draw debug information or not.
+        """
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['game_map', 'game_state'],
+        'max-line-length': 100,
+        'disable': ['E1136']
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
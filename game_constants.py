@@ -2,8 +2,7 @@
 
 Module with constants relevant to the Pac-Man game, to be used in other modules.
 """
-import pygame
-from vector import Vector
+from vector import Vector, TileVector
 
 
 # Game Size Constants
@@ -18,6 +17,7 @@ BOOST_SCORE = 50
 GHOST_SCORE = (50, 100, 200, 400)
 DEFAULT_LIVES = 3
 FPS = 24
+FAST_RENDER_FPS = 30
 
 # Positioning Constants
 DEFAULT_POS = Vector(14, 14) * TILE_SIZE - TILE_CENTER_X
@@ -28,18 +28,22 @@ GHOST_POS = (DEFAULT_POS, HOME_POS,
              Vector(16, 17) * TILE_SIZE - TILE_CENTER_X)
 
 # Movement Constants
-DIRECTION_ORDER = (pygame.K_UP, pygame.K_LEFT, pygame.K_DOWN, pygame.K_RIGHT)
-DIRECTION = {pygame.K_UP: Vector(0, -1),
-             pygame.K_LEFT: Vector(-1, 0),
-             pygame.K_DOWN: Vector(0, 1),
-             pygame.K_RIGHT: Vector(1, 0)}
+UP = 'up'
+LEFT = 'left'
+DOWN = 'down'
+RIGHT = 'right'
+DIRECTION_ORDER = (UP, LEFT, DOWN, RIGHT)
+DIRECTION = {UP: TileVector(0, -1),
+             LEFT: TileVector(-1, 0),
+             DOWN: TileVector(0, 1),
+             RIGHT: TileVector(1, 0)}
 CORNER = {(0, -1): (-TILE_SIZE.y / 8, TILE_SIZE.y * 3 / 8),
           (-1, 0): (-TILE_SIZE.x / 8, TILE_SIZE.x * 3 / 8),
           (0, 1): (-TILE_SIZE.y * 3 / 8, TILE_SIZE.y / 8),
           (1, 0): (-TILE_SIZE.x * 3 / 8, TILE_SIZE.x / 8)}
 
-DEFAULT_DIR = Vector(0, 0)
-PLAYER_DIR = DIRECTION[pygame.K_LEFT]
+DEFAULT_DIR = TileVector(0, 0)
+PLAYER_DIR = DIRECTION[LEFT]
 BASE_SPEED = 10 * TILE_SIZE.x / FPS
 DEFAULT_SPEED = round(BASE_SPEED * 0.75, 2)
 PLAYER_SPEED = round(BASE_SPEED * 0.8, 2)
@@ -54,13 +58,14 @@ FRIGHT = (100, 100, 200)
 GHOST_COLOURS = (RED, PINK, TEAL, ORANGE)
 
 # Tile Types
-EMPTY = '0'
-WALL = '1'
-DOT = '2'
-BOOST = '5'
-DOOR = '8'
-OUT = '9'
-BAD_TILES = {WALL, DOOR, OUT}
+EMPTY = 0
+WALL = 1
+DOT = 2
+BOOST = 5
+DOOR = 8
+OUT = 9
+BAD_MASK = (1 << WALL) | (1 << DOOR) | (1 << OUT)
+PELLET_MASK = (1 << DOT) | (1 << BOOST)
 
 # Round Timing Constants
 BOOST_TIME = 6 * FPS
@@ -76,7 +81,7 @@ HOME_TIME = 2 * FPS
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['pygame', 'vector'],
+        'extra-imports': ['vector'],
         'max-line-length': 100,
         'disable': ['E1136', 'E1101']
     })
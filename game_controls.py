@@ -2,15 +2,21 @@
 
 Module containing the controller classes used to move the actors in PacMan.
 """
-from typing import Optional
-import random
-import pygame
+from __future__ import annotations
 
+from typing import Optional, TYPE_CHECKING
+import struct
+
+from game_map import GameMap
 from game_state import Actor, GameState
-from helpers import grid_distance, within_grid
-from vector import Vector
+from helpers import grid_distance
+from vector import TileVector
 import game_constants as const
 
+# Only imports when type-checking, as the random number generator is the game's own.
+if TYPE_CHECKING:
+    from random import Random
+
 
 class Controller:
     """A class representing a controller for an actor.
@@ -34,7 +40,7 @@ class Controller:
 
         game.controllers.append(self)
 
-    def control(self, grid: list[list[int]]) -> None:
+    def control(self, grid: GameMap) -> None:
         """Controls the actor for given tick.
 
         Args:
@@ -46,11 +52,23 @@ class Controller:
         """Resets the controller for when associated actor dies."""
         raise NotImplementedError
 
-    def draw_debug(self, screen: pygame.Surface) -> None:
-        """Draws out debugging information.
+    def snapshot(self) -> bytes:
+        """Returns the controller's current state packed into bytes, not including its actor. """
+        raise NotImplementedError
+
+    def restore(self, data: bytes, offset: int) -> int:
+        """Restores the controller's state from a snapshot packed in data at offset, returning
+        the offset following it.
 
         Args:
-            - screen: The pygame game screen.
+            - data: The bytes containing the snapshot.
+            - offset: The position of the controller's snapshot within data.
+        """
+        raise NotImplementedError
+
+    def debug_tiles(self) -> list[tuple[TileVector, tuple[int, int, int]]]:
+        """Returns the tiles to be highlighted as debugging information, along with the colour of
+        each.
         """
         raise NotImplementedError
 
@@ -58,7 +76,7 @@ class Controller:
 class InputController(Controller):
     """A class representing a controller for an actor which uses keyboard input. """
 
-    def control(self, grid: list[list[int]]) -> None:
+    def control(self, grid: GameMap) -> None:
         """Controls the actor for given tick using keyboard input.
 
         Args:
@@ -69,18 +87,31 @@ class InputController(Controller):
 
         # Changes direction based on key presses
         for event in self.game.events:
-            if event.type == pygame.KEYDOWN:
-                self.actor.change_direction(grid, const.DIRECTION.get(event.key))
+            self.actor.change_direction(grid, const.DIRECTION.get(event))
 
     def reset(self) -> None:
         """Resets the controller for when associated actor dies. Not needed for this subclass! """
 
-    def draw_debug(self, screen: pygame.Surface) -> None:
-        """Draws out debugging information. Not needed for this subclass!
+    def snapshot(self) -> bytes:
+        """Returns the controller's current state packed into bytes, which is empty for this
+        subclass!
+        """
+        return b''
+
+    def restore(self, data: bytes, offset: int) -> int:
+        """Restores the controller's state from a snapshot, which is empty for this subclass!
 
         Args:
-            - screen: The pygame game screen.
+            - data: The bytes containing the snapshot.
+            - offset: The position of the controller's snapshot within data.
+        """
+        return offset
+
+    def debug_tiles(self) -> list[tuple[TileVector, tuple[int, int, int]]]:
+        """Returns the tiles to be highlighted as debugging information. Not needed for this
+        subclass!
         """
+        return []
 
 
 class GhostController(Controller):
@@ -90,6 +121,8 @@ class GhostController(Controller):
         - home_timer: The time in ticks until the ghost moves out of home.
         - state: The state of the ghosts. (See Representation Invariants)
         - mode: The mode of active state ghosts. (See Representation Invariants)
+        - random: The random number generator used when frightened, which is the game's own
+                  so that the ghosts of a seeded game replay identically.
 
     Representation Invariants:
         - self.state in {'inactive', 'home', 'active'}
@@ -98,15 +131,22 @@ class GhostController(Controller):
     home_timer: int
     state: str
     mode: str
+    random: 'Random'
 
     # Private Instance Attributes:
     #  - _next_tile : The target tile to arrive to.
     #  - _next_direction: The direction to be turned towards when possible
     #  - _is_frightened : Whether ghost is frightened.
-    _next_tile: Optional[Vector]
-    _next_direction: Optional[Vector]
+    _next_tile: Optional[TileVector]
+    _next_direction: Optional[TileVector]
     _is_frightened: bool
 
+    # The packed format of a ghost controller's snapshot: home timer, state, mode, next tile and
+    # next direction (with whether each is set) and whether the ghost is frightened.
+    SNAPSHOT = struct.Struct('<iBB?ii?bb?')
+    STATES = ('inactive', 'home', 'active')
+    MODES = ('', 'scatter', 'chase')
+
     def __init__(self, game: GameState, actor: Actor) -> None:
         """Initializes a new ghost controller with given game and ghost actor.
 
@@ -122,8 +162,9 @@ class GhostController(Controller):
         self.state = 'inactive'
         self.mode = self.game.mode()
         self._is_frightened = False
+        self.random = game.random
 
-    def control(self, grid: list[list[int]]) -> None:
+    def control(self, grid: GameMap) -> None:
         """Controls the ghost actor for given tick based on current state or mode.
 
         Args:
@@ -166,38 +207,61 @@ class GhostController(Controller):
             # If activated, change to home state
             self.state = 'home'
 
-    def control_target(self, grid: list[list[int]]) -> None:
+    def coast(self, grid: GameMap) -> bool:
+        """Moves the ghost actor for a tick if its control would leave it unchanged, which is
+        when it is active and still travelling towards its next tile. Returns whether or not the
+        ghost was moved, otherwise it is to be controlled and updated as usual.
+
+        Args:
+            - grid: The current game's map grid.
+        """
+        if self.state != 'active' or self._next_tile is None or \
+                self.actor.queued_direction() is not None or \
+                (self.mode != self.game.mode() and not self._is_frightened):
+            return False
+
+        # Next tile is reached at a distance of 0, or unreachable past a distance of 1.
+        position = self.actor.state.position
+        if abs(self._next_tile.x - round(position.x / const.TILE_SIZE.x)) + \
+                abs(self._next_tile.y - round(position.y / const.TILE_SIZE.y)) != 1:
+            return False
+
+        position.set_components(*self.actor.moved_position(grid))
+        return True
+
+    def control_target(self, grid: GameMap) -> None:
         """Controls the ghost actor for given tick if in targeting mode.
         Follows the original ghost targeting system closely!
 
         Args:
             - grid: The current game's map grid.
         """
-        self._next_direction = -self.actor.state.direction
-        best_distance = None
+        candidates = self.candidate_directions(grid)
 
-        # Try each direction.
-        for key in const.DIRECTION_ORDER:
-            direction = const.DIRECTION[key]
-            candidate = self._next_tile + direction
+        # Only evaluate targeting at intersections, as corridors leave no choice.
+        if len(candidates) <= 1:
+            self._next_direction = candidates[0] if candidates != [] \
+                else -self.actor.state.direction
+            return
 
-            # If can't turn in this direction.
-            if not within_grid(candidate) or candidate == self.actor.tile() or \
-                    grid[candidate.y][candidate.x] in const.BAD_TILES:
-                continue
+        # Target different things depending on mode.
+        if self.mode == 'scatter':
+            target = self.scatter_target()
+        else:  # Chase mode case by representation invariant.
+            target = self.chase_target()
 
-            # Target different things depending on mode.
-            if self.mode == 'scatter':
-                distance = grid_distance(candidate, self.scatter_target())
-            else:  # Chase mode case by representation invariant.
-                distance = grid_distance(candidate, self.chase_target())
+        best_distance = None
+
+        # Try each direction.
+        for direction in candidates:
+            distance = grid_distance(self._next_tile + direction, target)
 
             # Choose this direction if shortest so far.
             if best_distance is None or distance < best_distance:
                 self._next_direction = direction
                 best_distance = distance
 
-    def control_fright(self, grid: list[list[int]]) -> None:
+    def control_fright(self, grid: GameMap) -> None:
         """Controls the ghost actor for given tick if frightened.
         When frightened, it turns a random direction at each intersection.
 
@@ -205,22 +269,30 @@ class GhostController(Controller):
             - grid: The current game's map grid.
         """
         # Collect all possible directions at intersection.
-        candidates = []
-        for key in const.DIRECTION_ORDER:
-            direction = const.DIRECTION[key]
-            candidate = self._next_tile + direction
-
-            # Can't turn in this direction.
-            if within_grid(candidate) and candidate != self.actor.tile() and \
-                    grid[candidate.y][candidate.x] not in const.BAD_TILES:
-                candidates.append(direction)
+        candidates = self.candidate_directions(grid)
 
         # Randomly choose direction from allowed directions.
         if candidates != []:
-            self._next_direction = random.choice(candidates)
+            self._next_direction = self.random.choice(candidates)
         else:
             self._next_direction = -self.actor.state.direction
 
+    def candidate_directions(self, grid: GameMap) -> list[TileVector]:
+        """Returns the directions the ghost actor can turn towards at its next tile, which
+        excludes turning back onto its current tile.
+
+        Preconditions:
+            - self._next_tile is not None and grid.within_map(*self._next_tile)
+
+        Args:
+            - grid: The current game's map grid.
+        """
+        tile = self.actor.tile()
+        next_index = grid.index(self._next_tile.x, self._next_tile.y)
+        back = grid.index(tile.x, tile.y) - next_index
+
+        return [direction for direction, offset in grid.exits[next_index] if offset != back]
+
     def control_home(self) -> None:
         """Controls the ghost actor for given tick if in home state.
         When wait until home timer is over, then moves outside of ghost home.
@@ -274,32 +346,58 @@ class GhostController(Controller):
         self.mode = self.game.mode()
         self.home_timer = 0
 
-    def draw_debug(self, screen: pygame.Surface) -> None:
-        """Draws out debugging information for ghost controller.
+    def snapshot(self) -> bytes:
+        """Returns the ghost controller's current state packed into bytes, not including its
+        actor.
+        """
+        next_tile = TileVector(0, 0) if self._next_tile is None else self._next_tile
+        next_direction = TileVector(0, 0) if self._next_direction is None \
+            else self._next_direction
+
+        return self.SNAPSHOT.pack(self.home_timer, self.STATES.index(self.state),
+                                  self.MODES.index(self.mode), self._next_tile is not None,
+                                  next_tile.x, next_tile.y, self._next_direction is not None,
+                                  next_direction.x, next_direction.y, self._is_frightened)
+
+    def restore(self, data: bytes, offset: int) -> int:
+        """Restores the ghost controller's state from a snapshot packed in data at offset,
+        returning the offset following it.
 
         Args:
-            - screen: The pygame game screen.
+            - data: The bytes containing the snapshot.
+            - offset: The position of the controller's snapshot within data.
         """
-        if self.state != 'active' or self.mode == 'fright' or self._next_tile is None:
-            return
+        (self.home_timer, state, mode, has_next_tile, next_x, next_y, has_next_direction,
+         direction_x, direction_y, self._is_frightened) = self.SNAPSHOT.unpack_from(data, offset)
+
+        self.state = self.STATES[state]
+        self.mode = self.MODES[mode]
+        self._next_tile = TileVector(next_x, next_y) if has_next_tile else None
+        self._next_direction = TileVector(direction_x, direction_y) if has_next_direction \
+            else None
+
+        return offset + self.SNAPSHOT.size
 
-        # Draw desired next position.
-        next_position = self._next_tile * const.TILE_SIZE
-        pygame.draw.rect(screen, (100, 0, 100), pygame.Rect(*next_position, *const.TILE_SIZE))
+    def debug_tiles(self) -> list[tuple[TileVector, tuple[int, int, int]]]:
+        """Returns the ghost's desired next tile and target tile to be highlighted as debugging
+        information, along with the colour of each.
+        """
+        if self.state != 'active' or self.mode == 'fright' or self._next_tile is None:
+            return []
 
-        # Draw target tile depending on mode
+        # Get target tile depending on mode
         if self.game.mode() == 'scatter':
-            target_position = self.scatter_target() * const.TILE_SIZE
+            target_tile = self.scatter_target()
         else:  # Chase mode case
-            target_position = self.chase_target() * const.TILE_SIZE
+            target_tile = self.chase_target()
 
-        pygame.draw.rect(screen, (0, 100, 100), pygame.Rect(*target_position, *const.TILE_SIZE))
+        return [(self._next_tile, (100, 0, 100)), (target_tile, (0, 100, 100))]
 
-    def scatter_target(self) -> Vector:
+    def scatter_target(self) -> TileVector:
         """Returns the target tile during scatter mode. """
         raise NotImplementedError
 
-    def chase_target(self) -> Vector:
+    def chase_target(self) -> TileVector:
         """Returns the target tile during chase mode. """
         raise NotImplementedError
 
@@ -329,11 +427,11 @@ class BlinkyController(GhostController):
         super().reset()
         self.state = 'active'
 
-    def scatter_target(self) -> Vector:
+    def scatter_target(self) -> TileVector:
         """Returns the target tile during scatter mode, the top right corner. """
-        return Vector(25, 0)
+        return TileVector(25, 0)
 
-    def chase_target(self) -> Vector:
+    def chase_target(self) -> TileVector:
         """Returns the target tile during chase mode, PacMan itself! """
         return self.game.player_actor().tile()
 
@@ -365,15 +463,15 @@ class PinkyController(GhostController):
         super().reset()
         self.state = 'inactive'
 
-    def scatter_target(self) -> Vector:
+    def scatter_target(self) -> TileVector:
         """Returns the target tile during scatter mode, the top left corner. """
-        return Vector(2, 0)
+        return TileVector(2, 0)
 
-    def chase_target(self) -> Vector:
+    def chase_target(self) -> TileVector:
         """Returns the target tile during chase mode, 4 tiles ahead of PacMan. """
         player = self.game.player_actor()
 
-        if player.state.direction != const.DIRECTION[pygame.K_UP]:
+        if player.state.direction != const.DIRECTION[const.UP]:
             return player.tile() + 4 * player.state.direction
         else:
             # Replicates the original bug with Pinky's up-targeting
@@ -413,11 +511,11 @@ class InkyController(GhostController):
         super().reset()
         self.state = 'inactive'
 
-    def scatter_target(self) -> Vector:
+    def scatter_target(self) -> TileVector:
         """Returns the target tile during scatter mode, the bottom right corner. """
-        return Vector(27, 35)
+        return TileVector(27, 35)
 
-    def chase_target(self) -> Vector:
+    def chase_target(self) -> TileVector:
         """Returns the target tile during chase mode, which is opposite of Blinky's position
         relative to PacMan.
         """
@@ -462,11 +560,11 @@ class ClydeController(GhostController):
         super().reset()
         self.state = 'inactive'
 
-    def scatter_target(self) -> Vector:
+    def scatter_target(self) -> TileVector:
         """Returns the target tile during scatter mode, the bottom left corner. """
-        return Vector(0, 35)
+        return TileVector(0, 35)
 
-    def chase_target(self) -> Vector:
+    def chase_target(self) -> TileVector:
         """Returns the target tile during chase mode, which PacMan itself, unless Clyde is within
         8 tiles of PacMan, for which it uses its scatter target.
         """
@@ -475,7 +573,7 @@ class ClydeController(GhostController):
         if grid_distance(self.actor.tile(), player_tile) > 8:
             return player_tile
         else:
-            return Vector(0, 35)
+            return TileVector(0, 35)
 
     def check_active(self) -> bool:
         """Returns whether or not the ghost controller will be reactivate.
@@ -493,10 +591,10 @@ class ClydeController(GhostController):
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['random', 'pygame', 'game_constants', 'game_state',
+        'extra-imports': ['random', 'struct', 'game_constants', 'game_map', 'game_state',
                           'helpers', 'vector'],
         'max-line-length': 100,
-        'disable': ['E1136', 'E1101']
+        'disable': ['E1136', 'E1101', 'C0415']
     })
 
     import python_ta.contracts
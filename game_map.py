@@ -0,0 +1,588 @@
+"""CSC111 Final Project
+
+Module containing the GameMap class, a compiled representation of the game's map grid. Maps are
+compiled from their csv files into a versioned binary file next to them, which is loaded with mmap
+so that every game and process shares the same read-only tables.
+"""
+from __future__ import annotations
+
+from os.path import abspath, basename, dirname, splitext
+from typing import Iterable, Optional, Union
+import csv
+import mmap
+import os
+import struct
+import tempfile
+import zlib
+
+from vector import TileVector
+import game_constants as const
+
+
+# Compiled map file constants
+MAP_MAGIC = b'PMAP'
+MAP_VERSION = 2
+MAP_HEADER = struct.Struct('=4sHHHHHHI')
+MAP_BYTE_ORDER = 0x0102
+MAP_ALIGNMENT = 8
+NO_PATH = 0xFFFF
+
+# The directions in the order that tables of the map store them
+DIRECTIONS = tuple(const.DIRECTION[key] for key in const.DIRECTION_ORDER)
+
+
+class GameMap:
+    """A class representing a compiled map grid, stored as flat arrays of small integer tile codes.
+    A tile at (x, y) is stored at index y * width + x. Apart from the current tiles, the arrays are
+    read-only views into the compiled map.
+
+    Instance Attributes:
+        - width: The amount of tiles in each row of the map.
+        - height: The amount of rows in the map.
+        - tiles: The current tile codes of the map.
+        - walls: The wall bitmask of the map, which is 1 for tiles that cannot be moved onto.
+        - offsets: The index offset of each direction, in the order of const.DIRECTION_ORDER.
+        - exits: The directions leading to tiles that can be moved onto from each tile, along with
+                 their index offsets, in the order of const.DIRECTION_ORDER.
+
+    Representation Invariants:
+        - self.width > 0 and self.height > 0
+        - len(self.tiles) == len(self.walls) == self.width * self.height
+    """
+    width: int
+    height: int
+    tiles: bytearray
+    walls: memoryview
+    offsets: tuple[int, ...]
+    exits: tuple[tuple[tuple[TileVector, int], ...], ...]
+
+    # Private Instance Attributes:
+    #  - _default_tiles: The original tile codes of the map before gameplay.
+    #  - _columns: The column of each tile within the distance table, or -1 for walls.
+    #  - _column_count: The amount of columns in each row of the distance table.
+    #  - _wall_distances: The amount of tiles from each tile to the first wall in each direction,
+    #                     stored at index * 4 + the direction's position in DIRECTION_ORDER.
+    #  - _probes: The row of the distance table for each origin tile's column and first step
+    #             direction, stored at column * 4 + the direction's position, or -1 for walls.
+    #  - _pellet_distances: The amount of tiles from each tile to the first wall or pellet in
+    #                       each direction, kept up to date as the tiles change and stored like
+    #                       _wall_distances.
+    #  - _default_pellet_distances: The pellet distances of the original tiles.
+    #  - _distances: The distance table, where each row stores the shortest distance from its
+    #                first step tile to every tile, without passing through its origin tile.
+    _default_tiles: memoryview
+    _columns: memoryview
+    _column_count: int
+    _wall_distances: memoryview
+    _probes: memoryview
+    _distances: memoryview
+    _pellet_distances: bytearray
+    _default_pellet_distances: memoryview
+
+    def __init__(self, data: Union[bytes, mmap.mmap]) -> None:
+        """Initializes a map from its compiled data, without copying its tables.
+
+        Preconditions:
+            - data was returned by compile_map, or is a valid compiled map file
+
+        Args:
+            - data: The compiled map.
+        """
+        _, _, _, self.width, self.height, self._column_count, probe_count, _ = \
+            MAP_HEADER.unpack_from(data)
+        sections = map_sections(self.width, self.height, self._column_count, probe_count)
+        view = memoryview(data)
+
+        self._default_tiles = view[sections['tiles']]
+        self.tiles = bytearray(self._default_tiles)
+        self.walls = view[sections['walls']]
+        self._columns = view[sections['columns']].cast('h')
+        self._wall_distances = view[sections['wall_distances']]
+        self._probes = view[sections['probes']].cast('h')
+        self._distances = view[sections['distances']].cast('H')
+
+        self.offsets = tuple(direction.y * self.width + direction.x for direction in DIRECTIONS)
+
+        # Unpack the exits of every tile from their bitmasks.
+        exits = list(zip(DIRECTIONS, self.offsets))
+        self.exits = tuple(tuple(exit for position, exit in enumerate(exits)
+                                 if mask >> position & 1) for mask in view[sections['exits']])
+
+        self._default_pellet_distances = view[sections['pellet_distances']]
+        self._pellet_distances = bytearray(self._default_pellet_distances)
+
+    def reset(self) -> None:
+        """Resets the tiles of the map to their original pre-gameplay state. """
+        self.tiles[:] = self._default_tiles
+        self._pellet_distances[:] = self._default_pellet_distances
+
+    def set_tiles(self, tiles: bytes) -> None:
+        """Sets the codes of every tile in the map, such as from a snapshot of its tiles.
+
+        Preconditions:
+            - len(tiles) == self.width * self.height
+            - The wall bitmask is unchanged by setting the tiles.
+
+        Args:
+            - tiles: The new tile codes, stored like self.tiles.
+        """
+        for index, (old, new) in enumerate(zip(self.tiles, tiles)):
+            if old != new:
+                y, x = divmod(index, self.width)
+                self.set_tile(x, y, new)
+
+    def index(self, x: int, y: int) -> int:
+        """Returns the index of the tile at (x, y) within the flat tile arrays.
+
+        Args:
+            - x: The x-coordinate of the tile.
+            - y: The y-coordinate of the tile.
+        """
+        return y * self.width + x
+
+    def within_map(self, x: int, y: int) -> bool:
+        """Returns whether or not the tile at (x, y) is within the map bounds.
+
+        Args:
+            - x: The x-coordinate of the tile.
+            - y: The y-coordinate of the tile.
+        """
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def get_tile(self, x: int, y: int) -> int:
+        """Returns the code of the tile at (x, y).
+
+        Preconditions:
+            - self.within_map(x, y)
+
+        Args:
+            - x: The x-coordinate of the tile.
+            - y: The y-coordinate of the tile.
+        """
+        return self.tiles[y * self.width + x]
+
+    def set_tile(self, x: int, y: int, tile: int) -> None:
+        """Sets the code of the tile at (x, y).
+
+        Preconditions:
+            - self.within_map(x, y)
+            - The wall bitmask is unchanged by setting the tile.
+
+        Args:
+            - x: The x-coordinate of the tile.
+            - y: The y-coordinate of the tile.
+            - tile: The new tile code.
+        """
+        old = self.tiles[y * self.width + x]
+        self.tiles[y * self.width + x] = tile
+
+        if (const.PELLET_MASK >> old ^ const.PELLET_MASK >> tile) & 1:
+            self._update_pellet_distances(x, y)
+
+    def is_wall(self, x: int, y: int) -> bool:
+        """Returns whether or not the tile at (x, y) cannot be moved onto, which includes any
+        tile outside of the map bounds.
+
+        Args:
+            - x: The x-coordinate of the tile.
+            - y: The y-coordinate of the tile.
+        """
+        return not (0 <= x < self.width and 0 <= y < self.height) or \
+            self.walls[y * self.width + x] == 1
+
+    def count(self, tile: int) -> int:
+        """Returns the amount of tiles in the map with the given code.
+
+        Args:
+            - tile: The tile code to be counted.
+        """
+        return self.tiles.count(tile)
+
+    def replace(self, old: int, new: int) -> None:
+        """Replaces all tiles with code old by the code new.
+
+        Preconditions:
+            - const.BAD_MASK >> old & 1 == const.BAD_MASK >> new & 1
+
+        Args:
+            - old: The tile code to be replaced.
+            - new: The tile code to be replaced with.
+        """
+        self.tiles[:] = self.tiles.replace(bytes((old,)), bytes((new,)))
+
+        if (const.PELLET_MASK >> old ^ const.PELLET_MASK >> new) & 1:
+            self._pellet_distances = self._find_pellet_distances()
+
+    def wall_distance(self, index: int, direction: int) -> int:
+        """Returns the amount of tiles from the tile at index to the first wall or edge of the map
+        in the given direction.
+
+        Preconditions:
+            - 0 <= index < self.width * self.height
+            - 0 <= direction < len(const.DIRECTION_ORDER)
+
+        Args:
+            - index: The index of the tile the distance is from.
+            - direction: The position of the direction within const.DIRECTION_ORDER.
+        """
+        return self._wall_distances[index * 4 + direction]
+
+    def pellet_distance(self, index: int, direction: int) -> int:
+        """Returns the amount of tiles from the tile at index to the first wall, edge of the map or
+        pellet in the given direction, given the current tiles.
+
+        Preconditions:
+            - 0 <= index < self.width * self.height
+            - 0 <= direction < len(const.DIRECTION_ORDER)
+
+        Args:
+            - index: The index of the tile the distance is from.
+            - direction: The position of the direction within const.DIRECTION_ORDER.
+        """
+        return self._pellet_distances[index * 4 + direction]
+
+    def path_distances(self, origin: int, targets: Iterable[int]) -> list[int]:
+        """Returns the shortest distance needed to travel from the origin tile to get next to a
+        target tile for each first step, in the order of const.DIRECTION_ORDER, never revisiting
+        the origin tile. The distance is -1 if the first step is onto a wall, or if there is no
+        such path.
+
+        The tiles next to the targets are found once and shared by every first step. The search
+        stops once a tile next to a target is reached, so targets may be walls or the origin tile
+        itself.
+
+        Preconditions:
+            - 0 <= origin < self.width * self.height and not self.walls[origin]
+            - all(0 <= target < self.width * self.height for target in targets)
+
+        Args:
+            - origin: The index of the tile the paths start from.
+            - targets: The indices of the target tiles to look for.
+        """
+        columns = {self._columns[target + offset]
+                   for target in targets for _, offset in self.exits[target]}
+
+        distances = []
+        for probe in self._probes[self._columns[origin] * 4: self._columns[origin] * 4 + 4]:
+            row = probe * self._column_count
+            best = NO_PATH if probe < 0 else \
+                min((self._distances[row + column] for column in columns), default=NO_PATH)
+            distances.append(-1 if best == NO_PATH else best + 1)
+
+        return distances
+
+    def _is_stop(self, x: int, y: int) -> bool:
+        """Returns whether or not the tile at (x, y) ends the search for the first wall or pellet,
+        which includes any tile outside of the map bounds.
+
+        Args:
+            - x: The x-coordinate of the tile.
+            - y: The y-coordinate of the tile.
+        """
+        return self.is_wall(x, y) or const.PELLET_MASK >> self.tiles[y * self.width + x] & 1 == 1
+
+    def _find_pellet_distances(self) -> bytearray:
+        """Returns the amount of tiles from each tile to the first wall or pellet in each
+        direction, given the current tiles, stored like self._pellet_distances.
+        """
+        distances = bytearray(4 * len(self.tiles))
+        for position, (direction, offset) in enumerate(zip(DIRECTIONS, self.offsets)):
+            # Visit each tile after the next tile in direction, to continue on from its distance.
+            if offset > 0:
+                order = range(len(self.tiles) - 1, -1, -1)
+            else:
+                order = range(len(self.tiles))
+
+            for index in order:
+                y, x = divmod(index, self.width)
+                if self._is_stop(x + direction.x, y + direction.y):
+                    distances[index * 4 + position] = 1
+                else:
+                    distances[index * 4 + position] = distances[(index + offset) * 4 + position] + 1
+
+        return distances
+
+    def _update_pellet_distances(self, x: int, y: int) -> None:
+        """Updates the pellet distances after a pellet is placed on or removed from the tile at
+        (x, y). Only the tiles in the same row or column whose distance reaches the tile change.
+
+        Args:
+            - x: The x-coordinate of the tile.
+            - y: The y-coordinate of the tile.
+        """
+        is_stop = self._is_stop(x, y)
+        index = y * self.width + x
+
+        for position, direction in enumerate(DIRECTIONS):
+            distance = 0 if is_stop else self._pellet_distances[index * 4 + position]
+
+            # Walk back against direction, until a tile which ends the search is updated.
+            back_x, back_y = x - direction.x, y - direction.y
+            while self.within_map(back_x, back_y):
+                distance += 1
+                self._pellet_distances[(back_y * self.width + back_x) * 4 + position] = distance
+
+                if self._is_stop(back_x, back_y):
+                    break
+                back_x, back_y = back_x - direction.x, back_y - direction.y
+
+
+def map_sections(width: int, height: int, column_count: int,
+                 probe_count: int) -> dict[str, slice]:
+    """Returns the byte range of each section of a compiled map with the given sizes. Each section
+    starts aligned after the header and previous section, in the order they are returned.
+
+    Args:
+        - width: The amount of tiles in each row of the map.
+        - height: The amount of rows in the map.
+        - column_count: The amount of tiles which can be moved onto.
+        - probe_count: The amount of rows in the distance table.
+
+    >>> map_sections(2, 2, 1, 0)['walls']
+    slice(32, 36, None)
+    """
+    sizes = {'tiles': width * height,
+             'walls': width * height,
+             'columns': 2 * width * height,
+             'exits': width * height,
+             'wall_distances': 4 * width * height,
+             'pellet_distances': 4 * width * height,
+             'probes': 2 * 4 * column_count,
+             'distances': 2 * probe_count * column_count}
+
+    sections = {}
+    start = MAP_HEADER.size
+    for name, size in sizes.items():
+        start += -start % MAP_ALIGNMENT
+        sections[name] = slice(start, start + size)
+        start += size
+
+    return sections
+
+
+def compile_map(rows: list[list[int]], checksum: int = 0) -> bytes:
+    """Returns the compiled map of the given rows of tile codes. Along with the tiles, this holds
+    the tables derived from the map's walls: the index of tiles that can be moved onto, the exits
+    and distances to walls from each tile, and the table of shortest paths. The distances to the
+    first wall or pellet from each tile are also stored, for the original tiles.
+
+    Preconditions:
+        - rows != [] and all(len(row) == len(rows[0]) for row in rows)
+        - all(0 <= tile < 256 for row in rows for tile in row)
+
+    Args:
+        - rows: The rows of tile codes making up the map.
+        - checksum: The checksum of the map's source file.
+    """
+    width, height = len(rows[0]), len(rows)
+    tiles = bytes(tile for row in rows for tile in row)
+    walls = bytes(const.BAD_MASK >> tile & 1 for tile in tiles)
+    offsets = [direction.y * width + direction.x for direction in DIRECTIONS]
+
+    def is_wall(x: int, y: int) -> bool:
+        """Returns whether the tile at (x, y) is a wall or outside of the map. """
+        return not (0 <= x < width and 0 <= y < height) or walls[y * width + x] == 1
+
+    # Index the tiles which can be moved onto as the columns of the distance table.
+    open_tiles = [index for index, wall in enumerate(walls) if not wall]
+    columns = [-1] * len(walls)
+    for column, index in enumerate(open_tiles):
+        columns[index] = column
+
+    def is_stop(x: int, y: int) -> bool:
+        """Returns whether the tile at (x, y) is a wall, outside of the map, or a pellet. """
+        return is_wall(x, y) or const.PELLET_MASK >> tiles[y * width + x] & 1 == 1
+
+    # Find the exits and distances to walls and pellets in every direction from every tile.
+    exits = []
+    wall_distances = []
+    pellet_distances = []
+    for index in range(len(walls)):
+        y, x = divmod(index, width)
+        exits.append(sum(1 << position for position, direction in enumerate(DIRECTIONS)
+                         if not is_wall(x + direction.x, y + direction.y)))
+
+        for direction in DIRECTIONS:
+            distance = 1
+            while not is_wall(x + distance * direction.x, y + distance * direction.y):
+                distance += 1
+            wall_distances.append(distance)
+
+            distance = 1
+            while not is_stop(x + distance * direction.x, y + distance * direction.y):
+                distance += 1
+            pellet_distances.append(distance)
+
+    # Give a row of the distance table to every pair of an origin tile and a first step.
+    probes = [-1] * (4 * len(open_tiles))
+    probe_count = 0
+    for column, origin in enumerate(open_tiles):
+        for position, offset in enumerate(offsets):
+            if exits[origin] >> position & 1:
+                probes[column * 4 + position] = probe_count
+                probe_count += 1
+
+    # Build the distance table, using a breadth first search from each probe.
+    distances = [NO_PATH] * (probe_count * len(open_tiles))
+    for column, origin in enumerate(open_tiles):
+        for position, offset in enumerate(offsets):
+            if probes[column * 4 + position] >= 0:
+                row = probes[column * 4 + position] * len(open_tiles)
+                _search_distances(exits, columns, offsets, origin, origin + offset,
+                                  distances, row)
+
+    sections = map_sections(width, height, len(open_tiles), probe_count)
+    data = bytearray(sections['distances'].stop)
+    MAP_HEADER.pack_into(data, 0, MAP_MAGIC, MAP_VERSION, MAP_BYTE_ORDER, width, height,
+                         len(open_tiles), probe_count, checksum)
+    data[sections['tiles']] = tiles
+    data[sections['walls']] = walls
+    data[sections['columns']] = struct.pack(f'={len(columns)}h', *columns)
+    data[sections['exits']] = bytes(exits)
+    data[sections['wall_distances']] = bytes(wall_distances)
+    data[sections['pellet_distances']] = bytes(pellet_distances)
+    data[sections['probes']] = struct.pack(f'={len(probes)}h', *probes)
+    data[sections['distances']] = struct.pack(f'={len(distances)}H', *distances)
+
+    return bytes(data)
+
+
+def _search_distances(exits: list[int], columns: list[int], offsets: list[int], origin: int,
+                      step: int, distances: list[int], row: int) -> None:
+    """Fills in the row of the distance table with the shortest distance from the step tile to
+    every tile, without passing through the origin tile, using a breadth first search. The search
+    only steps through the exits of each tile, so it never leaves the map or wraps across rows.
+
+    Args:
+        - exits: The bitmask of directions leading to tiles that can be moved onto from each tile.
+        - columns: The column of each tile within the distance table.
+        - offsets: The index offset of each direction.
+        - origin: The index of the origin tile.
+        - step: The index of the first step tile.
+        - distances: The distance table.
+        - row: The position of the row within the distance table.
+    """
+    visited = bytearray(len(exits))
+    visited[origin] = 1
+    visited[step] = 1
+    distances[row + columns[step]] = 0
+
+    tile_queue = [step]
+    distance = 0
+    while tile_queue != []:
+        distance += 1
+        next_queue = []
+
+        for tile in tile_queue:
+            for position, offset in enumerate(offsets):
+                candidate = tile + offset
+                if exits[tile] >> position & 1 and not visited[candidate]:
+                    visited[candidate] = 1
+                    distances[row + columns[candidate]] = distance
+                    next_queue.append(candidate)
+
+        tile_queue = next_queue
+
+
+def load_compiled_map(file_path: str, checksum: Optional[int] = None) -> Optional[GameMap]:
+    """Returns the map from the compiled map file at file_path, mapped into memory rather than
+    read. Returns None if the file is missing, invalid, was compiled on a machine with another
+    byte order, or was compiled from a source file with a different checksum.
+
+    Args:
+        - file_path: The path for the compiled map file.
+        - checksum: The checksum of the map's source file, or None to not check it.
+    """
+    try:
+        with open(file_path, 'rb') as map_file:
+            data = mmap.mmap(map_file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(data) < MAP_HEADER.size:
+        return None
+
+    magic, version, byte_order, width, height, column_count, probe_count, source = \
+        MAP_HEADER.unpack_from(data)
+    if magic != MAP_MAGIC or version != MAP_VERSION or byte_order != MAP_BYTE_ORDER or \
+            checksum is not None and source != checksum or \
+            len(data) != map_sections(width, height, column_count, probe_count)['distances'].stop:
+        return None
+
+    return GameMap(data)
+
+
+def _replace_file(file_path: str, data: bytes) -> None:
+    """Replaces the file at file_path with one containing data. The data is written to a
+    temporary file in the same directory first, which is then moved into place, so that other
+    processes loading the file never map one which is partly written.
+
+    Args:
+        - file_path: The path of the file to be replaced.
+        - data: The contents of the new file.
+    """
+    descriptor, temp_path = tempfile.mkstemp(suffix='.tmp', prefix=basename(file_path) + '.',
+                                             dir=dirname(abspath(file_path)))
+    try:
+        with os.fdopen(descriptor, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, file_path)
+    except OSError:
+        os.remove(temp_path)
+        raise
+
+
+def load_game_map(file_path: str) -> GameMap:
+    """Returns the map from the csv or compiled map file at file_path. A csv file is only parsed
+    if the compiled map file next to it is missing or outdated, in which case the map is compiled
+    and saved again.
+
+    Preconditions:
+        - file_path is a valid path to a csv file or a compiled map file.
+
+    Args:
+        - file_path: The path for a csv file storing the map grid, or its compiled map file.
+    """
+    root, extension = splitext(file_path)
+    if extension == '.pmap':
+        grid = load_compiled_map(file_path)
+        if grid is None:
+            raise ValueError(f'{file_path} is not a valid compiled map.')
+        return grid
+
+    with open(file_path, 'rb') as csv_file:
+        source = csv_file.read()
+    checksum = zlib.crc32(source)
+
+    grid = load_compiled_map(root + '.pmap', checksum)
+    if grid is None:
+        reader = csv.reader(source.decode().splitlines())
+        data = compile_map([[int(tile) for tile in row] for row in reader], checksum)
+
+        # The map can always be compiled again, so it is fine if it cannot be saved.
+        try:
+            _replace_file(root + '.pmap', data)
+        except OSError:
+            pass
+
+        grid = GameMap(data)
+
+    return grid
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'mmap', 'os', 'os.path', 'struct', 'tempfile', 'zlib',
+                          'game_constants', 'vector'],
+        'allowed-io': ['load_game_map', 'load_compiled_map', '_replace_file'],
+        'max-line-length': 100,
+        'disable': ['E1136']
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -2,17 +2,16 @@
 
 Module containing the Game class used to run simulations for training.
 """
-from copy import deepcopy
 from typing import Type, Optional
-import csv
 import random
-import pygame
 
 from ai_neural_net import NeuralNetGraph
-from game_state import Actor, ActorState, GameState
-from vector import Vector
+from game_backend import Backend, HeadlessBackend, QUIT_EVENT
+from game_map import GameMap, load_game_map
+from game_state import Actor, ActorState, GameSnapshot, GameState
 
 import ai_controls
+import collision
 import game_constants as const
 import game_controls
 
@@ -21,21 +20,21 @@ class Game:
     """A class representing a game simulator.
 
     Instance Attributes:
-        - clock: The clock used to wait between ticks if in visualized mode.
-        - screen: The pygame screen used for drawing onto.
-        - font: The font used for writing on screen.
+        - backend: The backend handling the input, timing and drawing of the current game.
         - state: The state of the current game.
         - grid: The map of the game tiles.
+        - random: The random number generator owned by the game, which is reseeded for each
+                  seeded run and otherwise continues from the previous run.
     """
-    clock: pygame.time.Clock
-    screen: Optional[pygame.Surface]
-    font: Optional[pygame.font.Font]
+    backend: Backend
     state: Optional[GameState]
-    grid: list[list[int]]
+    grid: GameMap
+    random: random.Random
 
     # Private Instance Attributes:
-    #  - _default_grid: The original map grid before gameplay.
-    _default_grid: list[list[int]]
+    #  - _visual_backend : The backend for visual games, kept between runs so that the maze is
+    #                      only pre-rendered once. None until the first visual game.
+    _visual_backend: Optional[Backend]
 
     def __init__(self, map_path: str) -> None:
         """Initializes a game with the original pre-gameplay map.
@@ -43,33 +42,45 @@ class Game:
         Args:
             - map_path: The directory for the map grid csv.
         """
-        self.clock = pygame.time.Clock()
-        self.screen = None
-        self.font = None
+        self.backend = HeadlessBackend()
         self.state = None
+        self.random = random.Random()
 
-        # Load the map
-        with open(map_path) as csv_file:
-            reader = csv.reader(csv_file)
-            self._default_grid = list(reader)
-        self.grid = []
+        # Load and compile the map once, as each run only resets its tiles.
+        self.grid = load_game_map(map_path)
+
+        self._visual_backend = None
 
     def run(self, player_controller: Type[game_controls.Controller] = game_controls.InputController,
             neural_net: NeuralNetGraph = None, seed: Optional[int] = None,
-            config: dict = None) -> dict:
+            config: dict = None, snapshot: Optional[GameSnapshot] = None) -> dict:
         """Runs a game with given player controller, neural network, and configurations.
         Returns outcome of game as dict.
 
+        If a snapshot is given, the game continues from it instead of starting anew, and the
+        seed is ignored. This allows many neural networks to be run from a shared checkpoint.
+
+        Visual games are drawn every tick and played in real time, unless the configuration's
+        render_fps is set. Then, the game is simulated at full speed and drawn at most render_fps
+        times per second, while still handling input every tick. Pauses at the start of rounds
+        are still drawn in real time.
+
+        Preconditions:
+            - config is None or config.get('render_fps', None) is None or config['render_fps'] > 0
+            - snapshot is None or snapshot was taken in a game with the same player controller
+              class and whether it has ghosts
+
         Args:
             - player_controller: The class of the player controller to be used.
             - neural_net: The neural network to be used if and AIController is to be used.
             - seed: The random seed which allows for replaying successful runs.
             - config: The configuration dictionary for the game.
+            - snapshot: The snapshot of the game to continue from.
         """
         if config is None:
             config = {}
         if seed is not None:
-            random.seed(seed)
+            self.random.seed(seed)
 
         # Default configurations
         lives = config.get('lives', const.DEFAULT_LIVES)
@@ -77,11 +88,12 @@ class Game:
         has_boosts = config.get('has_boosts', True)
         is_visual = config.get('is_visual', True)
         is_debug = config.get('is_debug', False)
+        render_fps = config.get('render_fps', None)
 
         # Reinitialize the game state.
-        self.state = GameState(lives)
+        self.state = GameState(lives, self.random)
         if has_ghosts:
-            ghost_states = [ActorState(position, Vector(0, 0), colour, const.DEFAULT_SPEED)
+            ghost_states = [ActorState(position, const.DEFAULT_DIR, colour, const.DEFAULT_SPEED)
                             for position, colour in zip(const.GHOST_POS, const.GHOST_COLOURS)]
 
             game_controls.BlinkyController(self.state, Actor(ghost_states[0], False))
@@ -95,35 +107,52 @@ class Game:
         else:
             player_controller(self.state, Actor())
 
-        # New copy of original grid.
-        self.grid = deepcopy(self._default_grid)
+        # Reset to the original grid.
+        self.grid.reset()
         if not has_boosts:
-            self.grid = [[const.DOT if tile == const.BOOST else tile for tile in row]
-                         for row in self.grid]
+            self.grid.replace(const.BOOST, const.DOT)
 
-        # Set up screen if visual.
-        if is_visual:
-            pygame.init()
+        # Count the remaining pellets once, then keep the counts updated while eating.
+        self.state.dots_left = self.grid.count(const.DOT)
+        self.state.boosts_left = self.grid.count(const.BOOST)
 
-            self.screen = pygame.display.set_mode(const.SCREEN_SIZE.tuple())
-            self.font = pygame.font.SysFont('arial', 24)
-            pygame.display.set_caption('Pac-Man!')
+        # Set up the backend, which only loads pygame if visual.
+        if is_visual and self._visual_backend is None:
+            from pygame_backend import PygameBackend
+            self._visual_backend = PygameBackend()
+        self.backend = self._visual_backend if is_visual else HeadlessBackend()
+        self.backend.open()
+
+        # Restore the snapshot once the backend is set up, so that it is the one cleared.
+        if snapshot is not None:
+            self.restore(snapshot)
+
+        # Rounds only start with a pause when a display is there to show it.
+        self.state.timers.has_start_pause = self.backend.is_displayed()
 
         # Start game loop
         game_over = False
+        last_frame = 0
         while not game_over:
             if self.handle_input():
                 break
 
             game_over = self.update()
 
-            if is_visual:
-                self.draw(is_debug)
-                self.clock.tick(const.FPS)
+            timers = self.state.timers
+            is_paused = timers.has_start_pause and timers.start_timer > 0
+            if is_visual and (render_fps is None or is_paused):
+                self.backend.draw(self.state, self.grid, is_debug)
+                self.backend.tick(const.FPS)
+                last_frame = self.backend.get_time()
+            elif is_visual and self.backend.get_time() - last_frame >= 1000 / render_fps:
+                # Simulate at full speed, only drawing frames when due.
+                self.backend.draw(self.state, self.grid, is_debug)
+                last_frame = self.backend.get_time()
 
         # Set up the outputs of the simulation.
         output = {'game_win': self.check_win(), 'score': self.state.score,
-                  'force_quit': not game_over}
+                  'pellets_left': self.state.pellets_left(), 'force_quit': not game_over}
         if issubclass(player_controller, ai_controls.AIController):
             output['time_alive'] = round(self.state.player().ticks_alive / const.FPS)
 
@@ -131,16 +160,17 @@ class Game:
 
     def handle_input(self) -> bool:
         """Updates the input events of the game state, returns whether program is quit. """
-        if not pygame.display.get_init():
+        if not self.backend.is_displayed():
             return False
 
-        self.state.events = pygame.event.get()
+        self.state.events = self.backend.get_events()
 
         for event in self.state.events:
-            if event.type == pygame.KEYDOWN:
-                self.state.timers.start_timer = 0
-            elif event.type == pygame.QUIT:
+            if event == QUIT_EVENT:
                 return True
+            else:
+                # Any key press ends the start timer.
+                self.state.timers.start_timer = 0
         return False
 
     def update(self) -> bool:
@@ -158,15 +188,20 @@ class Game:
         state.player_actor().update(self.grid)
 
         # Control and update ghosts
+        player_position = state.player_actor().state.position
+        is_boost_over = state.timers.check_boost()
         for ghost in state.ghosts():
-            if state.timers.check_boost():
+            if is_boost_over:
                 ghost.set_frightened(False)
 
-            ghost.control(self.grid)
-            ghost.actor.update(self.grid)
+            if not ghost.coast(self.grid):
+                ghost.control(self.grid)
+                ghost.actor.update(self.grid)
 
             # Ghost collisions
-            is_collide = state.player_actor().rect().colliderect(ghost.actor.rect())
+            is_collide = collision.is_colliding(player_position.x, player_position.y,
+                                                ghost.actor.state.position.x,
+                                                ghost.actor.state.position.y)
             if is_collide and ghost.get_frightened():
                 # Eat ghost if they are frightened.
                 ghost.set_frightened(False)
@@ -184,13 +219,16 @@ class Game:
 
         # Tile collisions
         tile = state.player_actor().tile()
-        if self.grid[tile.y][tile.x] == const.DOT:
-            self.grid[tile.y][tile.x] = const.EMPTY
+        tile_type = self.grid.get_tile(tile.x, tile.y)
+        if tile_type == const.DOT:
+            self.grid.set_tile(tile.x, tile.y, const.EMPTY)
             state.score += const.DOT_SCORE
             state.dot_counter += 1
-        elif self.grid[tile.y][tile.x] == const.BOOST:
-            self.grid[tile.y][tile.x] = const.EMPTY
+            state.dots_left -= 1
+        elif tile_type == const.BOOST:
+            self.grid.set_tile(tile.x, tile.y, const.EMPTY)
             state.score += const.BOOST_SCORE
+            state.boosts_left -= 1
             state.timers.set_boost()
 
             for ghost in state.ghosts():
@@ -202,6 +240,27 @@ class Game:
         else:
             return False
 
+    def snapshot(self) -> GameSnapshot:
+        """Returns a snapshot of the current game, which it can be restored to later. """
+        return GameSnapshot(self.state.snapshot(), bytes(self.grid.tiles),
+                            self.random.getstate())
+
+    def restore(self, snapshot: GameSnapshot) -> None:
+        """Restores the current game to the state of the snapshot.
+
+        Preconditions:
+            - snapshot was taken in a game with the same types of controllers
+
+        Args:
+            - snapshot: The snapshot to be restored.
+        """
+        self.state.restore(snapshot.data)
+        self.grid.set_tiles(snapshot.tiles)
+        self.random.setstate(snapshot.random_state)
+
+        # Pellets may have been restored, so draw the next frame in full.
+        self.backend.clear()
+
     def lose_life(self) -> None:
         """Handles losing a life and resets the game to a starting state. """
         state = self.state
@@ -217,80 +276,19 @@ class Game:
             controller.reset()
             controller.actor.reset()
 
-    def draw(self, is_debug: bool = False) -> None:
-        """Draws the current game to the pygame screen.
-
-        Args:
-            - is_debug: Whether to draw debug information or not.
-        """
-        self.screen.fill((0, 0, 0))
-
-        # Draw each tile in grid.
-        for y, row in enumerate(self.grid):
-            for x, tile in enumerate(row):
-                self.draw_tile(tile, x, y, is_debug)
-
-        # Draw debug information.
-        if is_debug:
-            self.draw_debug()
-
-        # Draw actors.
-        for ghost in self.state.ghosts():
-            if ghost.home_timer <= 0:
-                ghost.actor.draw(self.screen, is_debug)
-        self.state.player_actor().draw(self.screen, is_debug)
-
-        # Write out score.
-        self.screen.blit(self.font.render(f'Score: {self.state.score}', 1,
-                                          (255, 255, 255)), (5, 5))
-        pygame.display.update()
-
-    def draw_debug(self) -> None:
-        """Draws controller debug information to the pygame screen. """
-        for controller in self.state.controllers:
-            controller.draw_debug(self.screen)
-
-    def draw_tile(self, tile: str, x: int, y: int, debug: bool = False) -> None:
-        """Draws the tile at position to the pygame screen.
-
-        Args:
-            - tile: The type of the tile to be drawn.
-            - x: The x-coordinate of the tile to be drawn.
-            - y: The y-coordinate of the tile to be drawn.
-            - is_debug: Whether to draw debug information or not.
-        """
-        position = const.TILE_SIZE * (x, y)
-
-        # Draws depending on the type of tile.
-        if tile == const.WALL:
-            pygame.draw.rect(self.screen, (0, 0, 255), pygame.Rect(*position, *const.TILE_SIZE))
-        elif tile == const.DOOR:
-            pygame.draw.rect(self.screen, (255, 150, 200), pygame.Rect(*position, *const.TILE_SIZE))
-        elif tile == const.DOT:
-            pygame.draw.circle(self.screen, (200, 200, 150),
-                               (position + const.TILE_SIZE / 2).tuple(), 2)
-        elif tile == const.BOOST:
-            pygame.draw.circle(self.screen, (220, 220, 220),
-                               (position + const.TILE_SIZE / 2).tuple(), 5)
-
-        # Draw an overlay of grids.
-        if debug:
-            pygame.draw.rect(self.screen, (100, 100, 100),
-                             pygame.Rect(*position, *const.TILE_SIZE), width=1)
-
     def check_win(self) -> bool:
         """Return if game is won, when all dots and boosts are eaten. """
-        return not any(tile in {const.DOT, const.BOOST} for row in self.grid for tile in row)
+        return self.state.pellets_left() == 0
 
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['copy', 'csv', 'random', 'pygame', 'ai_controls', 'ai_neural_net',
-                          'game_constants', 'game_controls', 'game_state', 'vector'],
-        'allowed-io': ['__init__'],
+        'extra-imports': ['random', 'ai_controls', 'ai_neural_net', 'collision', 'game_backend',
+                          'game_constants', 'game_controls', 'game_map', 'game_state',
+                          'pygame_backend'],
         'max-line-length': 100,
-        'disable': ['E1136', 'E1101']
+        'disable': ['E1136', 'E1101', 'C0415']
     })
 
     import python_ta.contracts
@@ -6,14 +6,17 @@ from __future__ import annotations
 
 from copy import copy
 from dataclasses import dataclass
-from typing import Optional, TYPE_CHECKING
-import pygame
-
-from helpers import within_grid
-from vector import Vector
+from typing import Any, Optional, TYPE_CHECKING
+import heapq
+import math
+import random
+import struct
+
+from game_map import GameMap
+from vector import Vector, TileVector, lerp
 import game_constants as const
 
-# Only imports when type-checking to avoid circular import issues
+# Only imports when type-checking to avoid circular import issues.
 if TYPE_CHECKING:
     import game_controls
 
@@ -29,11 +32,25 @@ class ActorState:
         - speed: The speed the actor travels.
     """
     position: Vector
-    direction: Vector
+    direction: TileVector
     colour: tuple[int, int, int]
     speed: float
 
 
+@dataclass(frozen=True)
+class GameSnapshot:
+    """A class representing a snapshot of a game at some tick, which a game can be restored to.
+
+    Instance Attributes:
+        - data: The packed states of the game, its timers, controllers and actors.
+        - tiles: The tile codes of the game's map.
+        - random_state: The state of the random number generator.
+    """
+    data: bytes
+    tiles: bytes
+    random_state: Any
+
+
 class Actor:
     """A class representing an actor.
 
@@ -44,11 +61,15 @@ class Actor:
     state: ActorState
     cornering: bool
 
+    # The packed format of an actor's snapshot: position, direction, queued direction (with
+    # whether there is one), colour and speed.
+    SNAPSHOT = struct.Struct('<ddbb?bbBBBd')
+
     # Private Instance Attributes:
     #  - _default_state: The original state which the actor can be reset to.
     #  - _queued_direction: The direction queued which can be played when possible.
     _default_state: ActorState
-    _queued_direction: Optional[Vector]
+    _queued_direction: Optional[TileVector]
 
     def __init__(self, default_state: ActorState = ActorState(const.PLAYER_POS, const.DEFAULT_DIR,
                                                               const.YELLOW, const.PLAYER_SPEED),
@@ -66,15 +87,13 @@ class Actor:
         self._queued_direction = None
         self.cornering = cornering
 
-    def tile(self) -> Vector:
+    def tile(self) -> TileVector:
         """Return the actor's current tile. """
-        return round(self.state.position / const.TILE_SIZE)
-
-    def rect(self) -> pygame.Rect:
-        """Return the actor's bounding rectangle. """
-        return pygame.Rect(*self.state.position, *const.TILE_SIZE)
+        position = self.state.position
+        return TileVector(round(position.x / const.TILE_SIZE.x),
+                          round(position.y / const.TILE_SIZE.y))
 
-    def change_direction(self, grid: list[list[int]], direction: Vector) -> None:
+    def change_direction(self, grid: GameMap, direction: Optional[TileVector]) -> None:
         """Change directions to direction vector depending on if valid at current state.
 
         Args:
@@ -92,7 +111,7 @@ class Actor:
                 # Queue the direction if not valid yet.
                 self._queued_direction = direction
 
-    def valid_direction(self, grid: list[list[int]], direction: Vector) -> bool:
+    def valid_direction(self, grid: GameMap, direction: TileVector) -> bool:
         """Return whether or not direction leads to a valid tile.
 
         Args:
@@ -100,14 +119,14 @@ class Actor:
             - direction: The direction to be tested.
         """
         next_tile = self.tile() + direction
-        return within_grid(next_tile) and grid[next_tile.y][next_tile.x] not in const.BAD_TILES
+        return not grid.is_wall(next_tile.x, next_tile.y)
 
     def within_cornering(self) -> bool:
         """Return whether or not player can turn at this point of the tile. """
         tile = self.tile()
 
         if self.cornering:
-            cornering = const.CORNER.get(self.state.direction.int_tuple())
+            cornering = const.CORNER.get(self.state.direction)
         else:
             cornering = (-self.state.speed / 2, self.state.speed / 2)
 
@@ -120,7 +139,7 @@ class Actor:
         else:
             return True
 
-    def same_axis(self, direction: Vector) -> bool:
+    def same_axis(self, direction: TileVector) -> bool:
         """Return whether or not direction is on same axis as the actor is currently travelling.
 
         Args:
@@ -128,7 +147,7 @@ class Actor:
         """
         return abs(self.state.direction.x) == abs(direction.x)
 
-    def update(self, grid: list[list[int]]) -> None:
+    def update(self, grid: GameMap) -> None:
         """Updates the actor's current state; moves or turns the actor.
 
         Args:
@@ -138,23 +157,72 @@ class Actor:
         if self._queued_direction is not None:
             self.change_direction(grid, self._queued_direction)
 
-        tile = self.tile()
-        next_tile = self.tile() + self.state.direction
+        self.state.position.set_components(*self.moved_position(grid))
 
-        # Gets the next valid tile in direction.
-        if not within_grid(next_tile) or grid[next_tile.y][next_tile.x] in const.BAD_TILES:
-            next_tile = tile
+    def moved_position(self, grid: GameMap) -> tuple[float, float]:
+        """Returns the position the actor moves to in a tick in its current direction, without
+        changing the actor's state.
 
-        # Chooses target tile depending on movement direction
-        if self.state.direction.y != 0:
-            target = Vector(tile.x, next_tile.y) * const.TILE_SIZE
-        elif self.state.direction.x != 0:
-            target = Vector(next_tile.x, tile.y) * const.TILE_SIZE
+        Args:
+            - grid: The current game's map grid.
+        """
+        position = self.state.position
+        direction = self.state.direction
+        tile_x = round(position.x / const.TILE_SIZE.x)
+        tile_y = round(position.y / const.TILE_SIZE.y)
+
+        # Chooses target tile depending on movement direction, if the next tile is valid.
+        if direction.y != 0:
+            next_y = tile_y + direction.y
+            if grid.is_wall(tile_x, next_y):
+                next_y = tile_y
+            target = (tile_x * const.TILE_SIZE.x, next_y * const.TILE_SIZE.y)
+        elif direction.x != 0:
+            next_x = tile_x + direction.x
+            if grid.is_wall(next_x, tile_y):
+                next_x = tile_x
+            target = (next_x * const.TILE_SIZE.x, tile_y * const.TILE_SIZE.y)
         else:
-            target = self.state.position
+            return position.x, position.y
 
         # Linearly interpolate to target tile.
-        self.state.position.lerp(target, self.state.speed)
+        return (lerp(position.x, target[0], self.state.speed),
+                lerp(position.y, target[1], self.state.speed))
+
+    def queued_direction(self) -> Optional[TileVector]:
+        """Return the direction queued by the actor, or None if no direction is queued. """
+        return self._queued_direction
+
+    def snapshot(self) -> bytes:
+        """Returns the actor's current state packed into bytes. """
+        state = self.state
+        queued = self._queued_direction
+        if queued is None:
+            queued_values = (False, 0, 0)
+        else:
+            queued_values = (True, queued.x, queued.y)
+
+        return self.SNAPSHOT.pack(state.position.x, state.position.y, state.direction.x,
+                                  state.direction.y, *queued_values, *state.colour, state.speed)
+
+    def restore(self, data: bytes, offset: int) -> int:
+        """Restores the actor's state from a snapshot packed in data at offset, returning the
+        offset following it.
+
+        Args:
+            - data: The bytes containing the snapshot.
+            - offset: The position of the actor's snapshot within data.
+        """
+        x, y, direction_x, direction_y, is_queued, queued_x, queued_y, red, green, blue, speed = \
+            self.SNAPSHOT.unpack_from(data, offset)
+
+        self.state.position = Vector(x, y)
+        self.state.direction = TileVector(direction_x, direction_y)
+        self._queued_direction = TileVector(queued_x, queued_y) if is_queued else None
+        self.state.colour = (red, green, blue)
+        self.state.speed = speed
+
+        return offset + self.SNAPSHOT.size
 
     def reset(self, position: Optional[Vector] = None) -> None:
         """Reset the actor to a default state.
@@ -188,95 +256,167 @@ class Actor:
         """Reset speed to the default. """
         self.state.speed = self._default_state.speed
 
-    def draw(self, screen: pygame.Surface, is_debug: bool = False) -> None:
-        """Draws the actor onto the pygame screen.
-
-        Args:
-            - screen: The pygame screen used for drawing onto.
-            - is_debug: Whether to draw debug information or not.
-        """
-        if is_debug:
-            # Draws current tile.
-            tile_position = self.tile() * const.TILE_SIZE
-            pygame.draw.rect(screen, (100, 100, 0), pygame.Rect(*tile_position, *const.TILE_SIZE))
-
-            # Draws next tile.
-            next_position = (self.tile() + self.state.direction) * const.TILE_SIZE
-            pygame.draw.rect(screen, (100, 0, 0), pygame.Rect(*next_position, *const.TILE_SIZE))
-
-            # Draws a yellow line representing current direction.
-            start_position = self.state.position + 8
-            end_direction = start_position + self.state.direction * 20
-            pygame.draw.line(screen, (200, 200, 0), start_position.tuple(),
-                             end_direction.tuple(), 4)
-
-            # Draws a red line representing the queued direction
-            if self._queued_direction is not None:
-                end_queue_dir = start_position + self._queued_direction * 20
-                pygame.draw.line(screen, (200, 50, 0), start_position.tuple(),
-                                 end_queue_dir.tuple(), 4)
-
-        # Draw actor.
-        pygame.draw.rect(screen, self.state.colour, self.rect())
-
 
 class TimerState:
-    """A class representing a game's timers and other timing elements.
+    """A class representing a game's timers and other timing elements. Rather than counting
+    down every tick, the timers are kept as a schedule of the ticks at which their events occur,
+    so that each tick only needs to be compared against the next event.
 
     Instance Attributes:
+        - tick: The amount of ticks the timers have been updated for.
         - mode_level: The level of game's current mode, between chase and scatter.
-        - round_timer: Timer used to cycle between modes.
         - start_timer: Timer used for the pause at start of rounds.
+        - has_start_pause: Whether rounds start with a pause, which is only for games with a
+                           display.
         - release_level: The level of ghost release, each level represents another ghost release.
-        - release_timer: Timer used to release the ghosts.
         - boost_level: The level of the boost point bonus.
-        - boost_timer: Timer used to set length of boost state.
+
+    Representation Invariants:
+        - self.tick >= 0
+        - 0 <= self.release_level <= 3
+        - every tick in self._deadlines is greater than self.tick
+        - self._next_tick is the earliest tick scheduled, or math.inf if there is none
     """
+    tick: int
     mode_level: int
-    round_timer: int
     start_timer: int
+    has_start_pause: bool
 
     release_level: int
-    release_timer: int
-
     boost_level: int
-    boost_timer: int
+
+    # Private Instance Attributes:
+    #  - _deadlines : A mapping of each timer event to the tick it is scheduled for, or None if it
+    #                 is not scheduled.
+    #  - _schedule : The priority queue of scheduled ticks and their events. Entries which no
+    #                longer match the event's deadline have been rescheduled, and are skipped.
+    #  - _next_tick : The earliest tick in the schedule.
+    _deadlines: dict[str, Optional[int]]
+    _schedule: list[tuple[int, str]]
+    _next_tick: float
+
+    # The timer events: changing mode, releasing another ghost, and ending the boost.
+    MODE_EVENT = 'mode'
+    RELEASE_EVENT = 'release'
+    BOOST_EVENT = 'boost'
+    EVENTS = (MODE_EVENT, RELEASE_EVENT, BOOST_EVENT)
+
+    # The packed format of the timers' snapshot: the tick, levels, start timer and the deadline of
+    # each event, where a deadline of -1 represents None.
+    SNAPSHOT = struct.Struct('<iiiiiiii')
 
     def __init__(self) -> None:
         """Initializes timers to their initial states. """
+        self.tick = 0
+        self._deadlines = {event: None for event in self.EVENTS}
+        self._schedule = []
+        self._next_tick = math.inf
+
         # Round timers
         self.mode_level = 0
-        self.round_timer = const.ROUND_PATTERN[self.mode_level][0]
         self.start_timer = const.ROUND_START
+        self.has_start_pause = False
+        self.schedule(self.MODE_EVENT, const.ROUND_PATTERN[self.mode_level][0] + 1)
 
         # Ghost release timer
-        self.release_level = 0
-        self.release_timer = 0
+        self.set_release()
 
         # Boost timer
         self.boost_level = 0
-        self.boost_timer = 0
+
+    def schedule(self, event: str, ticks: Optional[int]) -> None:
+        """Schedules the event to occur after the given amount of ticks, replacing when it was
+        previously scheduled for.
+
+        Preconditions:
+            - event in self.EVENTS
+            - ticks is None or ticks >= 1
+
+        Args:
+            - event: The event to be scheduled.
+            - ticks: The amount of ticks until the event, or None if it is not to occur.
+        """
+        if ticks is None:
+            self._deadlines[event] = None
+        else:
+            self._deadlines[event] = self.tick + ticks
+            heapq.heappush(self._schedule, (self.tick + ticks, event))
+            self._next_tick = min(self._next_tick, self.tick + ticks)
 
     def update(self) -> None:
         """Updates all timer states accordingly. """
-        # Update ghost release
-        if self.release_timer >= const.GHOST_RELEASE:
-            self.release_timer = 0
-            self.release_level += 1
-        elif self.release_level < 3:
-            self.release_timer += 1
-
-        # Update boost timer
-        if self.boost_timer > 0:
-            self.boost_timer -= 1
-
-        # Update round pattern
-        if self.round_timer is not None:
-            if self.round_timer <= 0:
+        self.tick += 1
+
+        if self.tick >= self._next_tick:
+            self.handle_events()
+
+    def handle_events(self) -> None:
+        """Handles the events scheduled up to the current tick, in the order they were
+        scheduled for.
+        """
+        while self._schedule and self._schedule[0][0] <= self.tick:
+            tick, event = heapq.heappop(self._schedule)
+
+            # Skip events which have been rescheduled.
+            if self._deadlines[event] != tick:
+                continue
+
+            if event == self.MODE_EVENT:
+                # Cycle to the next mode in the round pattern.
                 self.mode_level += 1
-                self.round_timer = const.ROUND_PATTERN[self.mode_level][0]
+                duration = const.ROUND_PATTERN[self.mode_level][0]
+                self.schedule(event, None if duration is None else duration + 1)
+            elif event == self.RELEASE_EVENT:
+                # Release another ghost, until all have been released.
+                self.release_level += 1
+                self.schedule(event, self.release_ticks() if self.release_level < 3 else None)
             else:
-                self.round_timer -= 1
+                self.schedule(event, None)
+
+        self._next_tick = self._schedule[0][0] if self._schedule else math.inf
+
+    def next_event(self) -> Optional[tuple[int, str]]:
+        """Returns the tick of the next scheduled event along with the event, or None if no event
+        is scheduled. Events scheduled for the same tick are returned in the order they are
+        handled.
+
+        >>> timers = TimerState()
+        >>> timers.next_event() == (TimerState.release_ticks(), TimerState.RELEASE_EVENT)
+        True
+        """
+        return min(((deadline, event) for event, deadline in self._deadlines.items()
+                    if deadline is not None), default=None)
+
+    @staticmethod
+    def release_ticks() -> int:
+        """Returns the amount of ticks between each ghost release. """
+        return math.ceil(const.GHOST_RELEASE) + 1
+
+    def snapshot(self) -> bytes:
+        """Returns the timers' current states packed into bytes. """
+        deadlines = [-1 if self._deadlines[event] is None else self._deadlines[event]
+                     for event in self.EVENTS]
+        return self.SNAPSHOT.pack(self.tick, self.mode_level, self.start_timer,
+                                  self.release_level, self.boost_level, *deadlines)
+
+    def restore(self, data: bytes, offset: int) -> int:
+        """Restores the timers' states from a snapshot packed in data at offset, returning the
+        offset following it.
+
+        Args:
+            - data: The bytes containing the snapshot.
+            - offset: The position of the timers' snapshot within data.
+        """
+        (self.tick, self.mode_level, self.start_timer, self.release_level, self.boost_level,
+         *deadlines) = self.SNAPSHOT.unpack_from(data, offset)
+
+        # Rebuild the schedule from the deadlines.
+        self._schedule = []
+        self._next_tick = math.inf
+        for event, deadline in zip(self.EVENTS, deadlines):
+            self.schedule(event, None if deadline < 0 else deadline - self.tick)
+
+        return offset + self.SNAPSHOT.size
 
     def set_start(self) -> None:
         """Reset the start timer to its initial state. """
@@ -284,7 +424,7 @@ class TimerState:
 
     def check_start(self) -> bool:
         """Returns whether or not start timer is still active. If it is, update its state. """
-        if pygame.display.get_init() and self.start_timer > 0:
+        if self.has_start_pause and self.start_timer > 0:
             self.start_timer -= 1
             return True
         else:
@@ -292,17 +432,17 @@ class TimerState:
 
     def set_release(self) -> None:
         """Reset the ghost release timers to their initial states. """
-        self.release_timer = 0
         self.release_level = 0
+        self.schedule(self.RELEASE_EVENT, self.release_ticks())
 
     def set_boost(self) -> None:
         """Reset the boost timers to their initial states. """
-        self.boost_timer = const.BOOST_TIME
         self.boost_level = 0
+        self.schedule(self.BOOST_EVENT, const.BOOST_TIME)
 
     def check_boost(self) -> bool:
-        """Returns whether or not boost is still active. """
-        return self.boost_timer <= 0
+        """Returns whether or not boost is no longer active. """
+        return self._deadlines[self.BOOST_EVENT] is None
 
 
 class GameState:
@@ -310,34 +450,53 @@ class GameState:
 
     Instance Attributes:
         - controllers: The list of all controllers used in game.
-        - events: The list of game input events.
+        - events: The list of game input events, as returned by its backend, or None if the
+                  game has no display.
         - lost_life: Whether or not the player has lost a life yet.
         - lives: The amount of lives the player has.
         - score: The current game state's score.
         - dot_counter: The amount of dots the player has eaten.
+        - dots_left: The amount of dots remaining on the map.
+        - boosts_left: The amount of boosts remaining on the map.
         - timers: The timer states for the game.
+        - random: The random number generator owned by the game, shared by its controllers.
 
     Representation Invariants:
         - self.score >= 0
         - self.dot_counter >= 0
+        - self.dots_left >= 0
+        - self.boosts_left >= 0
 
         - Player is the last element in self.controllers
     """
     controllers: list[game_controls.Controller]
-    events: Optional[list[pygame.event.Event]]
+    events: Optional[list[str]]
 
     lost_life: bool
     lives: int
     score: int
     dot_counter: int
+    dots_left: int
+    boosts_left: int
 
     timers: TimerState
+    random: random.Random
+
+    # Private Instance Attributes:
+    #  - _ghost_distances : The tiles of the player and of the ghosts which the ghost distances
+    #                       were last found for, along with those distances, or None if they
+    #                       have not been found yet.
+    _ghost_distances: Optional[tuple[tuple[int, ...], list[int]]]
 
-    def __init__(self, lives: int) -> None:
+    # The packed format of a game state's snapshot, not including its timers or controllers.
+    SNAPSHOT = struct.Struct('<?iiiii')
+
+    def __init__(self, lives: int, rng: Optional[random.Random] = None) -> None:
         """Initializes the game state with amount of initial lives.
 
         Args:
             - lives: The initial amount of lives the player has.
+            - rng: The game's random number generator, or a new unseeded one if None.
         """
         self.controllers = []
         self.events = None
@@ -347,7 +506,11 @@ class GameState:
         self.score = 0
 
         self.dot_counter = 0
+        self.dots_left = 0
+        self.boosts_left = 0
         self.timers = TimerState()
+        self.random = random.Random() if rng is None else rng
+        self._ghost_distances = None
 
     def player(self) -> game_controls.Controller:
         """Returns the player's controller, using the representation invariant. """
@@ -365,18 +528,77 @@ class GameState:
         """Returns a list of the ghosts' actors, given the representation invariant. """
         return [control.actor for control in self.controllers[:-1]]
 
+    def ghost_distances(self, grid: GameMap) -> list[int]:
+        """Returns the shortest distance needed for the player to travel to get next to a ghost
+        which is not inactive, for each direction of its first step in the order of
+        const.DIRECTION_ORDER, without moving back onto its own tile. The distance is -1 if there
+        is no such path.
+
+        The distances are looked up once for the current tiles of the player and the ghosts, and
+        kept until either moves, so every consumer within a tick shares them.
+
+        Preconditions:
+            - The player's tile is within the map and can be moved onto.
+
+        Args:
+            - grid: The current game's map grid.
+        """
+        tile = self.player_actor().tile()
+        # Ghosts outside the map can never be next to a tile which can be moved onto.
+        tiles = (grid.index(tile.x, tile.y),) + \
+            tuple(grid.index(ghost_tile.x, ghost_tile.y) for ghost_tile in
+                  (ghost.actor.tile() for ghost in self.ghosts() if ghost.state != 'inactive')
+                  if grid.within_map(ghost_tile.x, ghost_tile.y))
+
+        if self._ghost_distances is None or self._ghost_distances[0] != tiles:
+            self._ghost_distances = (tiles, grid.path_distances(tiles[0], tiles[1:]))
+
+        return self._ghost_distances[1]
+
+    def pellets_left(self) -> int:
+        """Returns the amount of dots and boosts remaining on the map. """
+        return self.dots_left + self.boosts_left
+
     def mode(self) -> str:
         """Returns the game's mode, either chase or scatter. """
         return const.ROUND_PATTERN[self.timers.mode_level][1]
 
+    def snapshot(self) -> bytes:
+        """Returns the game state, its timers, and all controllers and actors packed into bytes.
+        """
+        parts = [self.SNAPSHOT.pack(self.lost_life, self.lives, self.score, self.dot_counter,
+                                    self.dots_left, self.boosts_left), self.timers.snapshot()]
+        for controller in self.controllers:
+            parts.append(controller.snapshot())
+            parts.append(controller.actor.snapshot())
+
+        return b''.join(parts)
+
+    def restore(self, data: bytes) -> None:
+        """Restores the game state, its timers, and all controllers and actors from a snapshot.
+
+        Preconditions:
+            - data was returned by snapshot for a game state with the same types of controllers
+
+        Args:
+            - data: The bytes containing the snapshot.
+        """
+        (self.lost_life, self.lives, self.score, self.dot_counter, self.dots_left,
+         self.boosts_left) = self.SNAPSHOT.unpack_from(data)
+        offset = self.timers.restore(data, self.SNAPSHOT.size)
+
+        for controller in self.controllers:
+            offset = controller.restore(data, offset)
+            offset = controller.actor.restore(data, offset)
+
 
 if __name__ == '__main__':
     import python_ta
     python_ta.check_all(config={
-        'extra-imports': ['copy', 'dataclasses', 'pygame', 'game_constants', 'game_controls',
-                          'helpers', 'vector'],
+        'extra-imports': ['copy', 'dataclasses', 'heapq', 'math', 'random', 'struct',
+                          'game_constants', 'game_controls', 'game_map', 'vector'],
         'max-line-length': 100,
-        'disable': ['E1136']
+        'disable': ['E1136', 'C0415']
     })
 
     import python_ta.contracts
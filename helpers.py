@@ -18,8 +18,7 @@ def grid_distance(position: Vector, target: Vector) -> float:
     >>> grid_distance(Vector(2, 2), Vector(2, 2))
     0
     """
-    distances = position - target
-    return abs(distances.x) + abs(distances.y)
+    return abs(position.x - target.x) + abs(position.y - target.y)
 
 
 def within_grid(vector: Vector) -> bool:
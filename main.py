@@ -2,7 +2,6 @@
 
 The main module for running the program.
 """
-import user_interface
 import ai_trainer
 
 
@@ -12,7 +11,8 @@ NON_VISUAL_TRAINING = False
 
 if __name__ == '__main__':
     if not NON_VISUAL_TRAINING:
-        # Displays menu
+        # Displays menu, only loading pygame and its menus when needed
+        import user_interface
         menu = user_interface.UserInterface()
         menu.open_menu()
     else:
@@ -0,0 +1,306 @@
+"""CSC111 Final Project
+
+Module containing the PygameBackend class, which shows games in a pygame window. This is the only
+backend which imports pygame, so it is only loaded for visual games.
+"""
+from typing import Optional
+import pygame
+
+from game_backend import Backend, KEY_EVENT, QUIT_EVENT
+from game_map import GameMap
+from game_state import Actor, GameState
+import game_constants as const
+
+
+# The directions of the arrow keys
+KEY_DIRECTIONS = {pygame.K_UP: const.UP,
+                  pygame.K_LEFT: const.LEFT,
+                  pygame.K_DOWN: const.DOWN,
+                  pygame.K_RIGHT: const.RIGHT}
+
+
+class PygameBackend(Backend):
+    """A class representing the backend of a game shown in a pygame window.
+
+    Instance Attributes:
+        - clock: The clock used to wait between ticks.
+        - screen: The pygame screen used for drawing onto.
+        - font: The font used for writing on screen.
+    """
+    clock: pygame.time.Clock
+    screen: Optional[pygame.Surface]
+    font: Optional[pygame.font.Font]
+
+    # Private Instance Attributes:
+    #  - _maze : The walls and door of the map pre-rendered once, or None if not yet drawn.
+    #  - _background : The maze with the pellets left, which are erased from it as they are
+    #                  eaten. None if it needs to be redrawn in full.
+    #  - _pellets : The tile indices of the pellets drawn onto the background.
+    #  - _score_text : The score last rendered and its rendered text.
+    #  - _dirty : The rectangles of the screen drawn over the background in the last frame.
+    _maze: Optional[pygame.Surface]
+    _background: Optional[pygame.Surface]
+    _pellets: set[int]
+    _score_text: Optional[tuple[int, pygame.Surface]]
+    _dirty: list[pygame.Rect]
+
+    def __init__(self) -> None:
+        """Initializes a pygame backend, without opening its window yet. """
+        self.clock = pygame.time.Clock()
+        self.screen = None
+        self.font = None
+
+        self._maze = None
+        self._background = None
+        self._pellets = set()
+        self._score_text = None
+        self._dirty = []
+
+    def open(self) -> None:
+        """Opens the pygame window for a new game. """
+        pygame.init()
+
+        self.screen = pygame.display.set_mode(const.SCREEN_SIZE.tuple())
+        self.font = pygame.font.SysFont('arial', 24)
+        pygame.display.set_caption('Pac-Man!')
+
+        self.clear()
+
+    def clear(self) -> None:
+        """Clears what has been drawn, so that the next frame is drawn in full. """
+        self._background = None
+
+    def is_displayed(self) -> bool:
+        """Returns whether or not the game is shown on a display. """
+        return pygame.display.get_init()
+
+    def get_events(self) -> list[str]:
+        """Returns the input events since the last call. Each event is the direction of an arrow
+        key pressed, KEY_EVENT for other keys pressed, or QUIT_EVENT if the window is closed.
+        """
+        events = []
+        for event in pygame.event.get():
+            if event.type == pygame.KEYDOWN:
+                events.append(KEY_DIRECTIONS.get(event.key, KEY_EVENT))
+            elif event.type == pygame.QUIT:
+                events.append(QUIT_EVENT)
+
+        return events
+
+    def get_time(self) -> int:
+        """Returns the time in milliseconds since pygame was initialized. """
+        return pygame.time.get_ticks()
+
+    def tick(self, fps: int) -> None:
+        """Waits until a tick has passed since the last call, at fps ticks per second.
+
+        Preconditions:
+            - fps > 0
+
+        Args:
+            - fps: The amount of ticks per second.
+        """
+        self.clock.tick(fps)
+
+    def draw(self, state: GameState, grid: GameMap, is_debug: bool = False) -> None:
+        """Draws the game to the pygame screen. Only the parts of the screen which have changed
+        since the last frame are redrawn and updated, unless drawing debug information.
+
+        Args:
+            - state: The state of the game.
+            - grid: The map of the game tiles.
+            - is_debug: Whether to draw debug information or not.
+        """
+        if is_debug:
+            self.draw_full(state, grid)
+            return
+
+        if self._background is None or state.pellets_left() > len(self._pellets):
+            # Redraw the whole screen.
+            self.draw_background(grid)
+            self.screen.blit(self._background, (0, 0))
+            updated = [self.screen.get_rect()]
+        else:
+            # Erase last frame's actors and score, as well as any eaten pellets.
+            updated = self._dirty + self.erase_pellets(state, grid)
+            for rect in updated:
+                self.screen.blit(self._background, rect, rect)
+
+        # Draw actors.
+        self._dirty = []
+        for ghost in state.ghosts():
+            if ghost.home_timer <= 0:
+                self._dirty.append(self.draw_actor(self.screen, ghost.actor))
+        self._dirty.append(self.draw_actor(self.screen, state.player_actor()))
+
+        # Write out score, only rendering it again if changed.
+        if self._score_text is None or self._score_text[0] != state.score:
+            self._score_text = (state.score, self.font.render(f'Score: {state.score}',
+                                                              1, (255, 255, 255)))
+        self._dirty.append(self.screen.blit(self._score_text[1], (5, 5)))
+
+        pygame.display.update(updated + self._dirty)
+
+    def draw_full(self, state: GameState, grid: GameMap) -> None:
+        """Draws the game with debug information to the whole pygame screen.
+
+        Args:
+            - state: The state of the game.
+            - grid: The map of the game tiles.
+        """
+        self.screen.fill((0, 0, 0))
+
+        # Draw each tile in grid.
+        for index, tile in enumerate(grid.tiles):
+            y, x = divmod(index, grid.width)
+            self.draw_tile(self.screen, tile, x, y, True)
+
+        # Draw debug information.
+        for controller in state.controllers:
+            for tile, colour in controller.debug_tiles():
+                position = tile * const.TILE_SIZE
+                pygame.draw.rect(self.screen, colour, pygame.Rect(*position, *const.TILE_SIZE))
+
+        # Draw actors.
+        for ghost in state.ghosts():
+            if ghost.home_timer <= 0:
+                self.draw_actor(self.screen, ghost.actor, True)
+        self.draw_actor(self.screen, state.player_actor(), True)
+
+        # Write out score.
+        self.screen.blit(self.font.render(f'Score: {state.score}', 1,
+                                          (255, 255, 255)), (5, 5))
+        pygame.display.update()
+
+        # The next frame without debug information is drawn in full.
+        self.clear()
+
+    def draw_background(self, grid: GameMap) -> None:
+        """Draws the background of the maze and its remaining pellets, pre-rendering the walls
+        and door of the maze if they have not been yet.
+
+        Args:
+            - grid: The map of the game tiles.
+        """
+        if self._maze is None:
+            self._maze = pygame.Surface(const.SCREEN_SIZE.tuple()).convert()
+            self._maze.fill((0, 0, 0))
+            for index, tile in enumerate(grid.tiles):
+                if tile in {const.WALL, const.DOOR}:
+                    y, x = divmod(index, grid.width)
+                    self.draw_tile(self._maze, tile, x, y)
+
+        self._background = self._maze.copy()
+        self._pellets = set()
+        for index, tile in enumerate(grid.tiles):
+            if tile in {const.DOT, const.BOOST}:
+                y, x = divmod(index, grid.width)
+                self.draw_tile(self._background, tile, x, y)
+                self._pellets.add(index)
+
+    def erase_pellets(self, state: GameState, grid: GameMap) -> list[pygame.Rect]:
+        """Erases the pellets which have been eaten since the last frame from the background,
+        returning the rectangles of their tiles.
+
+        Args:
+            - state: The state of the game.
+            - grid: The map of the game tiles.
+        """
+        if len(self._pellets) == state.pellets_left():
+            return []
+
+        erased = []
+        for index in [index for index in self._pellets
+                      if grid.tiles[index] not in {const.DOT, const.BOOST}]:
+            y, x = divmod(index, grid.width)
+            rect = pygame.Rect(*(const.TILE_SIZE * (x, y)), *const.TILE_SIZE)
+
+            self._background.blit(self._maze, rect, rect)
+            self._pellets.remove(index)
+            erased.append(rect)
+
+        return erased
+
+    @staticmethod
+    def draw_actor(surface: pygame.Surface, actor: Actor, is_debug: bool = False) -> pygame.Rect:
+        """Draws the actor onto the pygame surface, returning its bounding rectangle.
+
+        Args:
+            - surface: The pygame surface to draw onto.
+            - actor: The actor to be drawn.
+            - is_debug: Whether to draw debug information or not.
+        """
+        if is_debug:
+            # Draws current tile.
+            tile_position = actor.tile() * const.TILE_SIZE
+            pygame.draw.rect(surface, (100, 100, 0), pygame.Rect(*tile_position, *const.TILE_SIZE))
+
+            # Draws next tile.
+            next_position = (actor.tile() + actor.state.direction) * const.TILE_SIZE
+            pygame.draw.rect(surface, (100, 0, 0), pygame.Rect(*next_position, *const.TILE_SIZE))
+
+            # Draws a yellow line representing current direction.
+            start_position = actor.state.position + 8
+            end_direction = start_position + actor.state.direction * 20
+            pygame.draw.line(surface, (200, 200, 0), start_position.tuple(),
+                             end_direction.tuple(), 4)
+
+            # Draws a red line representing the queued direction
+            queued_direction = actor.queued_direction()
+            if queued_direction is not None:
+                end_queue_dir = start_position + queued_direction * 20
+                pygame.draw.line(surface, (200, 50, 0), start_position.tuple(),
+                                 end_queue_dir.tuple(), 4)
+
+        # Draw actor.
+        rect = pygame.Rect(*actor.state.position, *const.TILE_SIZE)
+        pygame.draw.rect(surface, actor.state.colour, rect)
+
+        return rect
+
+    @staticmethod
+    def draw_tile(surface: pygame.Surface, tile: int, x: int, y: int,
+                  debug: bool = False) -> None:
+        """Draws the tile at position to the pygame surface.
+
+        Args:
+            - surface: The pygame surface to draw onto.
+            - tile: The code of the tile to be drawn.
+            - x: The x-coordinate of the tile to be drawn.
+            - y: The y-coordinate of the tile to be drawn.
+            - is_debug: Whether to draw debug information or not.
+        """
+        position = const.TILE_SIZE * (x, y)
+
+        # Draws depending on the type of tile.
+        if tile == const.WALL:
+            pygame.draw.rect(surface, (0, 0, 255), pygame.Rect(*position, *const.TILE_SIZE))
+        elif tile == const.DOOR:
+            pygame.draw.rect(surface, (255, 150, 200), pygame.Rect(*position, *const.TILE_SIZE))
+        elif tile == const.DOT:
+            pygame.draw.circle(surface, (200, 200, 150),
+                               (position + const.TILE_SIZE / 2).tuple(), 2)
+        elif tile == const.BOOST:
+            pygame.draw.circle(surface, (220, 220, 220),
+                               (position + const.TILE_SIZE / 2).tuple(), 5)
+
+        # Draw an overlay of grids.
+        if debug:
+            pygame.draw.rect(surface, (100, 100, 100),
+                             pygame.Rect(*position, *const.TILE_SIZE), width=1)
+
+
+if __name__ == '__main__':
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['pygame', 'game_backend', 'game_constants', 'game_map', 'game_state'],
+        'max-line-length': 100,
+        'disable': ['E1136', 'E1101']
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -0,0 +1,311 @@
+"""CSC111 Final Project
+
+Module for checking that simulations replay the same outcomes given the same seeds, which is run
+manually. The traces in data/traces.csv were recorded by record_traces before ghosts used the
+precomputed tile exits, so check_traces compares every tick since then. The outcomes in
+data/replays.csv were recorded by record_outcomes once neural networks could be mutated with a
+seed, so check_outcomes only covers changes made since then.
+"""
+from itertools import zip_longest
+from typing import Optional, TYPE_CHECKING
+import csv
+
+from game_state import GameState
+
+import ai_controls
+import ai_neural_net
+import game_constants
+import game_runner
+
+# Only imports when type-checking, so that traces can also be recorded on trees from before
+# games could be snapshot.
+if TYPE_CHECKING:
+    from game_state import GameSnapshot
+
+
+class SnapshotGame(game_runner.Game):
+    """A game which takes a snapshot of itself once the player has been alive for a given amount
+    of ticks.
+
+    Instance Attributes:
+        - snapshot_ticks: The amount of ticks the player is alive for before the snapshot is taken.
+        - taken_snapshot: The snapshot taken in the last game run, or None if it was over before.
+    """
+    snapshot_ticks: int
+    taken_snapshot: Optional['GameSnapshot']
+
+    def __init__(self, map_path: str, snapshot_ticks: int) -> None:
+        """Initializes a game which snapshots itself after snapshot_ticks ticks alive.
+
+        Args:
+            - map_path: The directory for the map grid csv.
+            - snapshot_ticks: The amount of ticks the player is alive for before the snapshot.
+        """
+        super().__init__(map_path)
+        self.snapshot_ticks = snapshot_ticks
+        self.taken_snapshot = None
+
+    def update(self) -> bool:
+        """Updates the game like Game.update, then takes the snapshot if it is due."""
+        game_over = super().update()
+
+        if not game_over and self.state.player().ticks_alive == self.snapshot_ticks:
+            self.taken_snapshot = self.snapshot()
+
+        return game_over
+
+
+class TraceGame(game_runner.Game):
+    """A game which records a trace of its state after every tick.
+
+    Instance Attributes:
+        - trace: The state after each tick of the last game run, as given by trace_state.
+    """
+    trace: list[list[float]]
+
+    def __init__(self, map_path: str) -> None:
+        """Initializes a game which traces its state.
+
+        Args:
+            - map_path: The directory for the map grid csv.
+        """
+        super().__init__(map_path)
+        self.trace = []
+
+    def update(self) -> bool:
+        """Updates the game like Game.update, then adds its state to the trace."""
+        game_over = super().update()
+        self.trace.append(trace_state(self.state))
+
+        return game_over
+
+
+def trace_state(state: GameState) -> list[float]:
+    """Returns the score, lives and timer levels of the game state, whether it is boosted, and
+    the position, direction and speed of each actor, starting with the player.
+
+    Args:
+        - state: The game state to be traced.
+    """
+    timers = state.timers
+    row = [state.score, state.lives, timers.mode_level, timers.release_level, timers.boost_level,
+           int(not timers.check_boost())]
+    for actor in [state.player_actor()] + state.ghosts_actor():
+        row.extend([actor.state.position.x, actor.state.position.y, actor.state.direction.x,
+                    actor.state.direction.y, actor.state.speed])
+
+    return row
+
+
+# The configurations of each training stage, from the first to the last.
+CONFIGS = [{'is_visual': False, 'has_ghosts': False, 'has_boosts': False, 'lives': 1},
+           {'is_visual': False, 'has_boosts': False, 'lives': 1},
+           {'is_visual': False, 'lives': 1},
+           {'is_visual': False}]
+
+
+def load_networks(network_path: str = 'data/test.csv',
+                  count: int = 20) -> list[ai_neural_net.NeuralNetGraph]:
+    """Returns the neural network stored at network_path, followed by mutated copies of it, so
+    that every neural network plays differently.
+
+    Preconditions:
+        - count > 0
+
+    Args:
+        - network_path: The path for the csv file storing the neural network.
+        - count: The amount of neural networks to be returned.
+    """
+    neural_net = ai_neural_net.load_neural_network(network_path)
+    return [neural_net] + [neural_net.mutate(0.1, seed) for seed in range(count - 1)]
+
+
+def replay(game: game_runner.Game, neural_net: ai_neural_net.NeuralNetGraph,
+           seed: Optional[int], config: dict, snapshot: Optional['GameSnapshot'] = None) -> dict:
+    """Returns the outcome of a headless game played by the neural network with given seed and
+    configurations, like Game.run, along with the exact amount of ticks the player was alive for.
+
+    Args:
+        - game: The game used to run the simulation.
+        - neural_net: The neural network to play with.
+        - seed: The random seed of the game.
+        - config: The configuration dictionary for the game.
+        - snapshot: The snapshot of the game to continue from.
+    """
+    outcome = game.run(ai_controls.AIController, neural_net, seed, config, snapshot)
+    outcome['ticks_alive'] = game.state.player().ticks_alive
+
+    return outcome
+
+
+def record_outcomes(file_path: str = 'data/replays.csv', network_path: str = 'data/test.csv',
+                    count: int = 20) -> None:
+    """Saves the outcome of the game played by each neural network given by load_networks for
+    every training configuration into a csv file, where each game's seed is the neural network's
+    position. The outcomes can then be checked by check_outcomes once the simulation changes.
+
+    Preconditions:
+        - count > 0
+
+    Args:
+        - file_path: The path for the csv file the outcomes are saved to.
+        - network_path: The path for the csv file storing the neural network to play with.
+        - count: The amount of neural networks, and so games, for each configuration.
+    """
+    game = game_runner.Game('data/map.csv')
+    neural_nets = load_networks(network_path, count)
+
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        for stage, config in enumerate(CONFIGS):
+            for seed, neural_net in enumerate(neural_nets):
+                outcome = replay(game, neural_net, seed, config)
+                writer.writerow([stage, seed, int(outcome['game_win']), outcome['score'],
+                                 outcome['pellets_left'], outcome['ticks_alive']])
+
+
+def check_outcomes(file_path: str = 'data/replays.csv',
+                   network_path: str = 'data/test.csv') -> int:
+    """Returns the amount of games whose outcome differs from the one saved in the csv file by
+    record_outcomes.
+
+    Preconditions:
+        - file_path was saved by record_outcomes with the neural network at network_path
+
+    Args:
+        - file_path: The path for the csv file the outcomes were saved to.
+        - network_path: The path for the csv file storing the neural network to play with.
+    """
+    with open(file_path, newline='') as file:
+        rows = [[int(value) for value in row] for row in csv.reader(file)]
+
+    game = game_runner.Game('data/map.csv')
+    neural_nets = load_networks(network_path, max(seed for _, seed, *_ in rows) + 1)
+
+    mismatches = 0
+    for stage, seed, *recorded in rows:
+        outcome = replay(game, neural_nets[seed], seed, CONFIGS[stage])
+        if [int(outcome['game_win']), outcome['score'], outcome['pellets_left'],
+                outcome['ticks_alive']] != recorded:
+            mismatches += 1
+
+    return mismatches
+
+
+def record_traces(file_path: str = 'data/traces.csv', network_path: str = 'data/test.csv',
+                  count: int = 5) -> None:
+    """Saves the trace of the game played by the neural network at network_path with each seed
+    below count for every training configuration into a csv file, where each row is the state
+    after a tick. The traces can then be checked by check_traces once the simulation changes.
+
+    Unlike record_outcomes, the neural network is not mutated, so that traces can be recorded on
+    any tree with a headless game.
+
+    Preconditions:
+        - count > 0
+
+    Args:
+        - file_path: The path for the csv file the traces are saved to.
+        - network_path: The path for the csv file storing the neural network to play with.
+        - count: The amount of seeds, and so games, for each configuration.
+    """
+    game = TraceGame('data/map.csv')
+    neural_net = ai_neural_net.load_neural_network(network_path)
+
+    with open(file_path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        for stage, config in enumerate(CONFIGS):
+            for seed in range(count):
+                game.trace = []
+                game.run(ai_controls.AIController, neural_net, seed, config)
+                writer.writerows([stage, seed, tick] + row for tick, row in enumerate(game.trace))
+
+
+def check_traces(file_path: str = 'data/traces.csv', network_path: str = 'data/test.csv') -> int:
+    """Returns the amount of ticks whose state differs from the one saved in the csv file by
+    record_traces. Ticks missing from either trace are counted as differing.
+
+    Preconditions:
+        - file_path was saved by record_traces with the neural network at network_path
+
+    Args:
+        - file_path: The path for the csv file the traces were saved to.
+        - network_path: The path for the csv file storing the neural network to play with.
+    """
+    traces = {}
+    with open(file_path, newline='') as file:
+        for stage, seed, _, *row in csv.reader(file):
+            traces.setdefault((int(stage), int(seed)), []).append([float(value) for value in row])
+
+    game = TraceGame('data/map.csv')
+    neural_net = ai_neural_net.load_neural_network(network_path)
+
+    mismatches = 0
+    for (stage, seed), recorded in traces.items():
+        game.trace = []
+        game.run(ai_controls.AIController, neural_net, seed, CONFIGS[stage])
+        mismatches += sum(row != recorded_row
+                          for row, recorded_row in zip_longest(game.trace, recorded))
+
+    return mismatches
+
+
+def check_snapshots(network_path: str = 'data/test.csv', count: int = 20,
+                    ticks: int = 10 * game_constants.FPS) -> int:
+    """Returns the amount of games whose outcome differs when restored from a snapshot taken
+    after the given amount of ticks from when played straight through, for every training
+    configuration. Games which are over before the snapshot is taken are not counted.
+
+    Preconditions:
+        - count > 0
+        - ticks > 0
+
+    Args:
+        - network_path: The path for the csv file storing the neural network to play with.
+        - count: The amount of neural networks, and so games, for each configuration.
+        - ticks: The amount of ticks the player is alive for before the snapshot is taken.
+    """
+    game = game_runner.Game('data/map.csv')
+    snapshot_game = SnapshotGame('data/map.csv', ticks)
+    neural_nets = load_networks(network_path, count)
+
+    mismatches = 0
+    for config in CONFIGS:
+        for seed, neural_net in enumerate(neural_nets):
+            snapshot_game.taken_snapshot = None
+            outcome = replay(snapshot_game, neural_net, seed, config)
+            if snapshot_game.taken_snapshot is None:
+                continue
+
+            if replay(game, neural_net, None, config, snapshot_game.taken_snapshot) != outcome:
+                mismatches += 1
+
+    return mismatches
+
+
+def print_replays() -> None:
+    """Prints the amount of mismatches found by every check in this module. """
+    print(f'Recorded traces: {check_traces()} mismatched ticks')
+    print(f'Recorded outcomes: {check_outcomes()} mismatched outcomes')
+    print(f'Snapshot games: {check_snapshots()} mismatched outcomes')
+
+
+if __name__ == '__main__':
+    print_replays()
+
+    import python_ta
+    python_ta.check_all(config={
+        'extra-imports': ['csv', 'itertools', 'game_state', 'ai_controls', 'ai_neural_net', 'game_constants',
+                          'game_runner'],
+        'allowed-io': ['record_traces', 'check_traces', 'record_outcomes', 'check_outcomes',
+                       'print_replays'],
+        'max-line-length': 100,
+        'disable': ['E1136']
+    })
+
+    import python_ta.contracts
+    python_ta.contracts.DEBUG_CONTRACTS = False
+    python_ta.contracts.check_all_contracts()
+
+    import doctest
+    doctest.testmod()
@@ -24,10 +24,12 @@ class UserSettings:
         - high_score: The high score for this current run of the program.
         - seed: The seed to be set for each AI played game.
         - is_debug: Whether or not to draw debug information.
+        - is_fast: Whether or not AI played and trained games are simulated at full speed.
     """
     high_score: int
     seed: Optional[int]
     is_debug: bool
+    is_fast: bool
 
 
 class UserInterface:
@@ -53,7 +55,7 @@ class UserInterface:
 
     def __init__(self) -> None:
         """Initializes a user interface object. """
-        self.settings = UserSettings(0, ai_const.SIMULATION_SEED, False)
+        self.settings = UserSettings(0, ai_const.SIMULATION_SEED, False, False)
         self.game = game_runner.Game('data/map.csv')
         self.trainer = ai_trainer.AITrainer()
 
@@ -124,7 +126,8 @@ class UserInterface:
         outcome = self.game.run(player_controller=ai_controls.AIController,
                                 neural_net=ai_neural_net.load_neural_network(path),
                                 seed=self.settings.seed,
-                                config={'is_debug': self.settings.is_debug})
+                                config={'is_debug': self.settings.is_debug,
+                                        'render_fps': self.render_fps()})
 
         if outcome['score'] > self.settings.high_score:
             self.settings.high_score = outcome['score']
@@ -152,7 +155,7 @@ class UserInterface:
         """
         self.trainer.start_training(input_path=self.sub_menu.get_input_data()['in'],
                                     output_path=self.sub_menu.get_input_data()['out'],
-                                    is_visual=True)
+                                    is_visual=True, render_fps=self.render_fps())
 
     def settings_menu(self) -> None:
         """Opens the settings menu of the Pac-Man AI Program after creating the
@@ -165,6 +168,8 @@ class UserInterface:
                                      onchange=self.set_seed)
         self.sub_menu.add.selector('Debug: ', [('OFF', False), ('ON', True)],
                                    onchange=self.set_debug)
+        self.sub_menu.add.selector('AI Speed: ', [('NORMAL', False), ('FAST', True)],
+                                   onchange=self.set_fast)
         self.sub_menu.add.button('Back', self.open_menu)
         self.sub_menu.add.button('Quit', pygame_menu.events.EXIT)
 
@@ -196,6 +201,26 @@ class UserInterface:
         """
         self.settings.is_debug = args[1]
 
+    def set_fast(self, *args) -> None:
+        """Triggered by interacting with the AI Speed Selector in the Settings Menu.
+
+        This function toggles the is_fast variable allowing AI played and trained games to be
+        simulated at full speed, while only drawing some frames.
+
+        Preconditions:
+            - len(args) >= 1 and type(args[1]) == bool
+
+        Args:
+            - args: The selected option, where args[1] is its bool representation.
+        """
+        self.settings.is_fast = args[1]
+
+    def render_fps(self) -> Optional[int]:
+        """Returns the frame rate to draw AI played and trained games at, or None if they are
+        played in real time.
+        """
+        return g_const.FAST_RENDER_FPS if self.settings.is_fast else None
+
 
 if __name__ == '__main__':
     import python_ta
@@ -1,6 +1,6 @@
 """CSC111 Final Project
 
-Module with containing the Vector class, which stores a vector.
+Module with containing the Vector and TileVector classes, which store vectors.
 """
 from __future__ import annotations
 
@@ -9,12 +9,13 @@ import math
 
 
 class Vector:
-    """A class representing a two dimensional vector.
+    """A class representing a two dimensional vector, such as an actor's position.
 
     Instance Attributes:
         - x: The x-coordinate of the vector.
         - y: the y-coordinate of the vector.
     """
+    __slots__ = ('x', 'y')
     x: float
     y: float
 
@@ -36,7 +37,7 @@ class Vector:
         """
         if isinstance(other, (int, float)):
             return Vector(self.x + other, self.y + other)
-        elif isinstance(other, Vector):
+        elif isinstance(other, (Vector, TileVector)):
             return Vector(self.x + other.x, self.y + other.y)
         elif isinstance(other, tuple):
             return Vector(self.x + other[0], self.y + other[1])
@@ -59,7 +60,7 @@ class Vector:
         """
         if isinstance(other, (int, float)):
             return Vector(self.x - other, self.y - other)
-        elif isinstance(other, Vector):
+        elif isinstance(other, (Vector, TileVector)):
             return Vector(self.x - other.x, self.y - other.y)
         elif isinstance(other, tuple):
             return Vector(self.x - other[0], self.y - other[1])
@@ -74,7 +75,7 @@ class Vector:
         """
         if isinstance(other, (int, float)):
             return Vector(self.x * other, self.y * other)
-        elif isinstance(other, Vector):
+        elif isinstance(other, (Vector, TileVector)):
             return Vector(self.x * other.x, self.y * other.y)
         elif isinstance(other, tuple):
             return Vector(self.x * other[0], self.y * other[1])
@@ -90,9 +91,14 @@ class Vector:
         return self.__mul__(other)
 
     def __truediv__(self, other: Any) -> Vector:
+        """Divides the vector by the other object, returning the resultant vector.
+
+        Args:
+            - other: The other object to be divided by.
+        """
         if isinstance(other, (int, float)):
             return Vector(self.x / other, self.y / other)
-        elif isinstance(other, Vector):
+        elif isinstance(other, (Vector, TileVector)):
             return Vector(self.x / other.x, self.y / other.y)
         elif isinstance(other, tuple):
             return Vector(self.x / other[0], self.y / other[1])
@@ -121,7 +127,7 @@ class Vector:
         Args:
             - other: The object to be compared to.
         """
-        if isinstance(other, Vector):
+        if isinstance(other, (Vector, TileVector)):
             return math.isclose(self.x, other.x) and math.isclose(self.y, other.y)
         elif isinstance(other, tuple):
             return math.isclose(self.x, other[0]) and math.isclose(self.y, other[1])
@@ -169,6 +175,16 @@ class Vector:
         """Returns the vector as a tuple of two ints."""
         return round(self.x), round(self.y)
 
+    def set_components(self, x: float, y: float) -> None:
+        """Sets the components of this vector to the given values.
+
+        Args:
+            - x: The new x-coordinate of the vector.
+            - y: The new y-coordinate of the vector.
+        """
+        self.x = x
+        self.y = y
+
     def lerp(self, target: Vector, magnitude: float) -> None:
         """Linearly interpolates this vector towards a target vector, which each component
         changing by a maximum of the magnitude value. Note this function mutations this vector.
@@ -184,6 +200,125 @@ class Vector:
         self.y = lerp(self.y, target.y, magnitude)
 
 
+class TileVector:
+    """A class representing a two dimensional vector of integers, such as a tile on the grid
+    or a movement direction. Unlike Vector, it is hashable and compared exactly, so it should not
+    be mutated once created.
+
+    Instance Attributes:
+        - x: The x-coordinate of the vector.
+        - y: the y-coordinate of the vector.
+
+    >>> TileVector(1, 2) + TileVector(0, -1)
+    TileVector(1, 1)
+    >>> 4 * TileVector(0, -1) == (0, -4)
+    True
+    """
+    __slots__ = ('x', 'y')
+    x: int
+    y: int
+
+    def __init__(self, x: int, y: int) -> None:
+        """Initialize a tile vector object.
+
+        Args:
+            - x: The x-coordinate of the vector.
+            - y: the y-coordinate of the vector.
+        """
+        self.x = x
+        self.y = y
+
+    def __add__(self, other: Any) -> TileVector:
+        """Adds the tile vector with another tile vector or tuple, returning the resultant vector.
+
+        Args:
+            - other: The other object to be added.
+        """
+        if isinstance(other, TileVector):
+            return TileVector(self.x + other.x, self.y + other.y)
+        elif isinstance(other, tuple):
+            return TileVector(self.x + other[0], self.y + other[1])
+        else:
+            return NotImplemented
+
+    def __sub__(self, other: Any) -> TileVector:
+        """Subtracts another tile vector or tuple from this vector, returning the resultant vector.
+
+        Args:
+            - other: The other object to be subtracted.
+        """
+        if isinstance(other, TileVector):
+            return TileVector(self.x - other.x, self.y - other.y)
+        elif isinstance(other, tuple):
+            return TileVector(self.x - other[0], self.y - other[1])
+        else:
+            return NotImplemented
+
+    def __mul__(self, other: Any) -> TileVector:
+        """Multiplies the tile vector by an integer, returning the resultant vector.
+
+        Args:
+            - other: The integer to be multiplied with.
+        """
+        if isinstance(other, int):
+            return TileVector(self.x * other, self.y * other)
+        else:
+            return NotImplemented
+
+    def __rmul__(self, other: Any) -> TileVector:
+        """Multiplies the integer with this tile vector, returning the resultant vector.
+
+        Args:
+            - other: The integer to be multiplied with.
+        """
+        return self.__mul__(other)
+
+    def __neg__(self) -> TileVector:
+        """Returns a tile vector with this vector's components having opposite sign."""
+        return TileVector(-self.x, -self.y)
+
+    def __eq__(self, other: Any) -> bool:
+        """Returns whether the other object contains exactly the same values.
+
+        Args:
+            - other: The object to be compared to.
+        """
+        if isinstance(other, TileVector):
+            return self.x == other.x and self.y == other.y
+        elif isinstance(other, tuple):
+            return (self.x, self.y) == other
+        else:
+            return NotImplemented
+
+    def __hash__(self) -> int:
+        """Returns the hash of this tile vector, which matches that of its tuple."""
+        return hash((self.x, self.y))
+
+    def __getitem__(self, item: int) -> int:
+        """Returns the vector component given index.
+
+        Preconditions:
+            - 0 <= item <= 1
+
+        Args:
+            - item: The index of the component to be retrieved.
+        """
+        if item == 0:
+            return self.x
+        elif item == 1:
+            return self.y
+        else:
+            raise IndexError
+
+    def __repr__(self) -> str:
+        """Returns text representation of this tile vector."""
+        return f'TileVector({self.x}, {self.y})'
+
+    def tuple(self) -> tuple[int, int]:
+        """Returns the tile vector as a tuple of two ints."""
+        return self.x, self.y
+
+
 def lerp(position: float, target: float, magnitude: float) -> float:
     """Linearly interpolates this position value towards a target value, which changes
     by a maximum of the magnitude value, returning the resulting position.